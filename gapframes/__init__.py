@@ -1,6 +1,49 @@
 """
 gapframes is a utility tool for navigating gaps between keyframes in Nuke.
+
+The keyframe and gap logic (gaps, gap_queries, gaps_container, key_cache, key_sources, sidecar, nk_parser,
+scan_stats) only needs the standard library. Nuke-bound and UI parts are only imported when first accessed,
+e.g. gapframes.utils or gapframes.open_panel.
 """
-from gapframes import utils, ui
-from gapframes.main import (open_panel, update_gap_list,
-                            cycle_next_gapframe, cycle_prev_gapframe, cycle_gap_distance)
+import importlib
+import sys
+
+# Submodules loaded on first attribute access. The Nuke-bound and UI ones need Nuke and/or PySide2.
+_LAZY_SUBMODULES = ("gaps", "gap_queries", "gaps_container", "key_cache", "key_sources", "nk_parser", "scan_stats",
+                    "sidecar", "main", "node_resolver", "ui", "utils")
+# Public functions loaded on first attribute access - {function name: submodule defining it}
+_LAZY_FUNCTIONS = {"open_panel": "main", "update_gap_list": "main", "cycle_next_gapframe": "main",
+                   "cycle_prev_gapframe": "main", "cycle_gap_distance": "main"}
+
+
+def _load(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module("gapframes." + name)
+    module_name = _LAZY_FUNCTIONS.get(name)
+    if module_name is None:
+        raise AttributeError("module 'gapframes' has no attribute '{0}'".format(name))
+    return getattr(importlib.import_module("gapframes." + module_name), name)
+
+def __getattr__(name):
+    return _load(name)
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_SUBMODULES) | set(_LAZY_FUNCTIONS))
+
+
+try:
+    import nuke
+except ImportError:
+    # Outside of Nuke, e.g. "python -m gapframes" or farm-side scripts.
+    nuke = None
+
+if nuke is not None and getattr(nuke, "GUI", False):
+    # Interactive session: hotkeys are available right away, the panel itself is only built on first use.
+    from gapframes.ui import hotkeys as _hotkeys
+    _hotkeys.register_hotkeys(_hotkeys.saved_hotkeys())
+
+    if sys.version_info[0] < 3:
+        # Modules can't have a __getattr__ before Python 3.7, keep the public API available the old way.
+        from gapframes import utils, ui
+        from gapframes.main import (open_panel, update_gap_list,
+                                    cycle_next_gapframe, cycle_prev_gapframe, cycle_gap_distance)
@@ -0,0 +1,228 @@
+"""
+Batch gap analysis of saved .nk scripts, without launching Nuke.
+
+Usage:
+    python -m gapframes [options] SCRIPT_OR_DIR [SCRIPT_OR_DIR ...]
+
+Prints one JSON object per script on its own line (JSON Lines), as soon as that script is done.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+except ImportError:
+    # Python 2 without the futures backport, multiprocessing.Pool does the fanning out instead.
+    ProcessPoolExecutor = None
+
+from gapframes import gap_queries, gaps
+from gapframes.nk_parser import iter_knob_keys, iter_script_lines, split_script
+
+# Scripts larger than this are split into several tasks, at top-level node boundaries.
+DEFAULT_CHUNK_MB = 32
+
+
+def _split_names(text):
+    """
+    Split a comma separated list of names, as typed in the panel's node/knob fields.
+    """
+    if not text:
+        return None
+    return [name for name in text.replace(" ", "").split(",") if name]
+
+def find_scripts(paths):
+    """
+    Expand directories into the .nk scripts they contain, recursively.
+
+    Args:
+        paths (list): script and directory paths
+
+    Return:
+        list: paths of .nk scripts
+    """
+    scripts = []
+    for path in paths:
+        if not os.path.isdir(path):
+            scripts.append(path)
+            continue
+        for root, _, file_names in os.walk(path):
+            scripts.extend(os.path.join(root, name) for name in sorted(file_names) if name.endswith(".nk"))
+    return scripts
+
+def scan_script_chunk(path, start, end, allow_knobs=None, exclude_knobs=None, node_names=None):
+    """
+    Find all key frame numbers within a byte range of a script. Runs in a worker process.
+
+    Args:
+        path (str): path to the .nk script
+        start (int): byte offset of the first top-level node of the range
+        end (int): byte offset of the end of the range, None for the end of the file
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        node_names (list, optional): only scan nodes with these names, full or base names
+
+    Return:
+        list: sorted, de-duplicated key frame numbers
+    """
+    knob_keys = []
+    lines = iter_script_lines(path, start, end)
+    for node_name, _, keys in iter_knob_keys(lines, allow_knobs, exclude_knobs):
+        if node_names and node_name not in node_names and node_name.rsplit(".", 1)[-1] not in node_names:
+            continue
+        knob_keys.append(keys)
+    return gaps.merge_key_arrays(knob_keys).tolist()
+
+def _scan_chunk_task(task):
+    # multiprocessing.Pool version of a chunk task, which reports failures instead of raising them.
+    try:
+        return task[0], scan_script_chunk(*task), None
+    except Exception as error:
+        return task[0], None, str(error)
+
+def iter_chunk_results(tasks, workers=None):
+    """
+    Run scan_script_chunk tasks across worker processes.
+
+    Args:
+        tasks (list): scan_script_chunk argument tuples, the script path first
+        workers (int, optional): worker processes, defaults to the CPU count
+
+    Yield:
+        tuple: (script path, chunk keys, None) or (script path, None, error message), as each task finishes
+    """
+    if ProcessPoolExecutor is None:
+        pool = multiprocessing.Pool(workers)
+        try:
+            for result in pool.imap_unordered(_scan_chunk_task, tasks):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict((executor.submit(scan_script_chunk, *task), task[0]) for task in tasks)
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as error:
+                yield futures[future], None, str(error)
+
+def build_report(path, chunk_keys, boundary_in=None, boundary_out=None, key_tolerance=0, collapse_dense=False,
+                 top_count=0, min_length=0, percentiles=None, review_distances=None):
+    """
+    Merge the keys found in each chunk of a script and describe its gaps.
+    Keys closer together than key_tolerance frames count as one, see gaps.merge_close_keys.
+    With collapse_dense, runs of baked keys are reported as dense segments instead of gaps.
+    The listed gaps can be cut down to the top_count longest ones at least min_length frames long,
+    the largest gap and percentiles are always of every gap.
+    With review_distances, the gapframes of every gap at those Gap Distances are added as a frame range.
+
+    Return:
+        dict: JSON-serialisable report of the script's gaps
+    """
+    keys = gaps.merge_key_arrays(gaps.clip_key_lists(chunk_keys, boundary_in, boundary_out))
+    keys = gaps.merge_close_keys(keys, key_tolerance)
+    if collapse_dense:
+        gap_arrays, dense_segments = gaps.split_dense_segments(keys)
+    else:
+        gap_arrays, dense_segments = gaps.compute_gaps(keys), None
+    largest_ind = gaps.largest_gap_index(gap_arrays)
+    largest_gap = None
+    if largest_ind is not None:
+        largest_gap = {"start": gap_arrays.starts[largest_ind], "end": gap_arrays.ends[largest_ind],
+                       "length": gap_arrays.lengths[largest_ind]}
+
+    listed_gaps = gap_queries.select_gap_arrays(gap_arrays, top_count, min_length)
+    report = {"script": path, "key_count": len(keys), "gap_count": len(gap_arrays.starts),
+              "largest_gap": largest_gap, "gaps": [list(gap) for gap in gaps.gap_pairs(listed_gaps)]}
+    if percentiles:
+        histogram = gap_queries.gap_length_histogram(gaps.gap_pairs(gap_arrays))
+        report["length_percentiles"] = histogram.percentiles(percentiles)
+    if review_distances:
+        review_frames = gaps.gapframe_targets(gap_arrays.starts, gap_arrays.ends, review_distances)
+        report["review_frames"] = gaps.format_frame_ranges(review_frames)
+    if dense_segments is not None:
+        report["dense_segments"] = [list(segment) for segment in zip(*dense_segments)]
+    return report
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m gapframes", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="+", help=".nk scripts, or directories to search for them")
+    parser.add_argument("--nodes", help="comma separated node names to scan, all nodes if omitted")
+    parser.add_argument("--allow-knobs", help="comma separated knob names to scan, all knobs if omitted")
+    parser.add_argument("--exclude-knobs", help="comma separated knob names to ignore")
+    parser.add_argument("--boundary-in", type=float,
+                        help="ignore keys at or below this frame, only used together with --boundary-out")
+    parser.add_argument("--boundary-out", type=float,
+                        help="ignore keys at or above this frame, only used together with --boundary-in")
+    parser.add_argument("--key-tolerance", type=float, default=0,
+                        help="count keys closer together than this many frames as one, e.g. 0.001")
+    parser.add_argument("--collapse-dense", action="store_true",
+                        help="report runs of baked keys as dense segments [start, end, step] instead of gaps")
+    parser.add_argument("--top", type=int, default=0, help="only list this many of the longest gaps")
+    parser.add_argument("--min-length", type=float, default=0, help="only list gaps at least this many frames long")
+    parser.add_argument("--percentiles", help="comma separated gap length percentiles to report, e.g. 50,90,99")
+    parser.add_argument("--review-frames", action="store_true",
+                        help="add the gapframes of every gap as a frame range to render")
+    parser.add_argument("--review-distances", default="25,50,75",
+                        help="comma separated Gap Distances, in percent, of the --review-frames")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the CPU count")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_MB,
+                        help="split scripts larger than this many megabytes into several tasks")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _parse_args(argv)
+    node_names = _split_names(args.nodes)
+    allow_knobs = _split_names(args.allow_knobs)
+    exclude_knobs = _split_names(args.exclude_knobs)
+    chunk_size = int(args.chunk_mb * 1024 * 1024)
+    percentiles = [float(percent) for percent in _split_names(args.percentiles) or []]
+    percentiles = [int(percent) if percent.is_integer() else percent for percent in percentiles]
+    review_distances = None
+    if args.review_frames:
+        review_distances = [float(distance) for distance in _split_names(args.review_distances)]
+
+    failed = False
+    pending = {}  # {script path: [chunks left, list of chunk keys]}
+    tasks = []
+    for path in find_scripts(args.paths):
+        try:
+            chunks = split_script(path, chunk_size)
+        except (IOError, OSError) as error:
+            print(json.dumps({"script": path, "error": str(error)}))
+            failed = True
+            continue
+        pending[path] = [len(chunks), []]
+        tasks.extend((path, start, end, allow_knobs, exclude_knobs, node_names) for start, end in chunks)
+
+    for path, keys, error in iter_chunk_results(tasks, args.workers):
+        state = pending.get(path)
+        if state is None:
+            continue  # An earlier chunk of this script already failed.
+        if error is not None:
+            print(json.dumps({"script": path, "error": error}))
+            failed = True
+            del pending[path]
+            continue
+
+        state[1].append(keys)
+        state[0] -= 1
+        if state[0] == 0:
+            del pending[path]
+            report = build_report(path, state[1], args.boundary_in, args.boundary_out,
+                                  args.key_tolerance, args.collapse_dense, args.top, args.min_length,
+                                  percentiles, review_distances)
+            print(json.dumps(report))
+            sys.stdout.flush()
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,44 @@
-import imp
 import os
 
 # Find the UI file in the "ui" submodule directory of gapframes.
-_, gapframes_path, _ = imp.find_module("gapframes")
+gapframes_path = os.path.dirname(os.path.abspath(__file__))
 PANEL_UI_PATH = os.path.join(gapframes_path, "ui", "GapframesPanel.ui")
 PREFERENCES_PATH = os.path.expanduser("~/.nuke/gapframes_preferences.ini")
+# Keyframe index sidecars of scanned scripts and the compiled panel UI are cached next to the preferences file.
+CACHE_DIR = os.path.join(os.path.dirname(PREFERENCES_PATH), "gapframes_cache")
+SIDECAR_DIR = CACHE_DIR
+UI_CACHE_DIR = os.path.join(CACHE_DIR, "ui")
+# Profiles of updates run with "Profile Next Update" are saved next to the preferences file too.
+PROFILE_STATS_DIR = os.path.dirname(PREFERENCES_PATH)
 
 PANEL_OBJECT_NAME = "GapframesPanel"
 NUM_TYPES = (int, float)
+# How long a time-sliced scan may block the Qt event loop for, per timer tick.
+SCAN_TICK_BUDGET_MS = 30
+# How often the shown panel checks whether the playhead moved, to re-centre the Scan Boundary window on it.
+PLAYHEAD_POLL_MS = 100
+# Budget of the per-knob keyframe cache, whichever limit is hit first evicts the least recently used knobs.
+KEY_CACHE_MAX_ENTRIES = 20000
+KEY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# How many of the slowest nodes of a scan to report in its stats.
+SLOWEST_NODES_COUNT = 5
+# Runs of at least this many keys at the same step, of at most this many frames, are baked animation
+# and get collapsed into one dense segment instead of one gap per step.
+DENSE_SEGMENT_MIN_KEYS = 8
+DENSE_SEGMENT_MAX_STEP = 1
+# Gap Distances, in percent, of the gapframes rendered for a review of every gap.
+GAPFRAME_TARGET_DISTANCES = (25, 50, 75)
+# Gap Distance, in percent, cycling with the hotkeys uses while the panel isn't there to set it.
+DEFAULT_GAP_DISTANCE = 50
+# Repeated Cycle Next/Previous presses less than this apart move the playhead once, to where the last one leads.
+# While a hotkey is held, the playhead still follows at least this often.
+NAVIGATOR_COALESCE_MS = 50
+NAVIGATOR_MAX_WAIT_MS = 250
+# Knob classes which can never hold animation, they're skipped without asking them for keys.
+STATIC_KNOB_CLASSES = frozenset(["Tab_Knob", "BeginTabGroup_Knob", "EndTabGroup_Knob", "Text_Knob", "Help_Knob",
+                                 "PyScript_Knob", "PyCustom_Knob", "Script_Knob", "Obsolete_Knob", "Link_Knob",
+                                 "Channel_Knob", "ChannelMask_Knob", "Input_Knob", "Format_Knob", "Font_Knob",
+                                 "File_Knob", "Password_Knob", "Transform2d_Knob", "Histogram_Knob"])
 SAMPLE_GAPS_CONTAINER = {"start": NUM_TYPES, "end": NUM_TYPES, "length": NUM_TYPES, "repr": str}
 NODE_SELECTION_RADIO_BUTTONS = ["nodeSection_propertiesPanel_radioButton",
                                 "nodeSection_selectedNodes_radioButton",
@@ -15,6 +46,9 @@ NODE_SELECTION_RADIO_BUTTONS = ["nodeSection_propertiesPanel_radioButton",
 # Preferences only need to be restored for the following objects.
 PREFERENCES_TARGETS = set(["GapframesPanel", "nodeSection_propertiesPanel_radioButton",
                            "nodeSection_selectedNodes_radioButton", "nodeSection_specificNodes_radioButton",
+                           "extraOptions_progressiveScan_checkBox", "extraOptions_showScanStats_checkBox",
+                           "extraOptions_keyTolerance_doubleSpinBox", "extraOptions_collapseDense_checkBox",
+                           "extraOptions_minGapLength_doubleSpinBox", "extraOptions_topGaps_spinBox",
                            "nodeNames_input_lineEdit", "knobSection_allowedKnobs_lineEdit",
                            "knobSection_excludedKnobs_lineEdit", "hotkeys_openPanel_lineEdit",
                            "hotkeys_updateList_lineEdit", "hotkeys_cycleGapDistances_lineEdit",
@@ -28,14 +62,17 @@ CYCLE_PREV = "Cycle Previous"
 CYCLE_NEXT = "Cycle Next"
 
 BUTTON_ORDER = [OPEN_PANEL, UPDATE_GAPS_LIST, CYCLE_GAP_DISTANCE, CYCLE_NEXT, CYCLE_PREV]
-# "func" has to be the name of a method defined in the Communicator class
+# "func" has to be the name of a function defined in gapframes.main
 HOTKEYS = {
-    # "hotkey" here is only the default, actual value is grabbed from UI
-    OPEN_PANEL: {"hotkey": "alt+q", "func": "show_gapframes_panel", "ui_elem": "hotkeys_openPanel_lineEdit"},
-    UPDATE_GAPS_LIST: {"hotkey": "alt+r", "func": "emit_update_gap_list", "ui_elem": "hotkeys_updateList_lineEdit"},
-    CYCLE_GAP_DISTANCE: {"hotkey": "alt+e", "func": "emit_cycle_gap_distance",
+    # "hotkey" here is only the default, actual value is grabbed from the saved preferences or the UI
+    OPEN_PANEL: {"hotkey": "alt+q", "func": "open_panel", "ui_elem": "hotkeys_openPanel_lineEdit"},
+    UPDATE_GAPS_LIST: {"hotkey": "alt+r", "func": "update_gap_list", "ui_elem": "hotkeys_updateList_lineEdit"},
+    CYCLE_GAP_DISTANCE: {"hotkey": "alt+e", "func": "cycle_gap_distance",
                          "ui_elem": "hotkeys_cycleGapDistances_lineEdit"},
-    CYCLE_NEXT: {"hotkey": "alt+d", "func": "emit_cycle_next", "ui_elem": "hotkeys_cycleNextItem_lineEdit"},
-    CYCLE_PREV: {"hotkey": "alt+a", "func": "emit_cycle_prev", "ui_elem": "hotkeys_cyclePrevItem_lineEdit"}
+    CYCLE_NEXT: {"hotkey": "alt+d", "func": "cycle_next_gapframe", "ui_elem": "hotkeys_cycleNextItem_lineEdit"},
+    CYCLE_PREV: {"hotkey": "alt+a", "func": "cycle_prev_gapframe", "ui_elem": "hotkeys_cyclePrevItem_lineEdit"}
 }
 HOTKEY_UI_ITEMS = [hotkey_settings.get("ui_elem") for hotkey_settings in HOTKEYS.values()]
+# Defaults of preferences which were never saved, widgets without one keep what the .ui file sets.
+PREFERENCE_DEFAULTS = dict((hotkey_settings["ui_elem"], hotkey_settings["hotkey"])
+                           for hotkey_settings in HOTKEYS.values())
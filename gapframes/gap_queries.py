@@ -0,0 +1,179 @@
+"""
+Queries over keyframe gaps: the N largest or smallest gaps, gaps within a length range and length
+histograms. Each query is a single pass over (start, end) gaps, e.g. as streamed by gaps.iter_gaps,
+holding no more than what it returns.
+"""
+from array import array
+from heapq import nlargest, nsmallest
+
+from gapframes.gaps import GapArrays
+
+# Percentiles reported by default, e.g. by the batch report.
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _gap_length(gap):
+    return gap[1] - gap[0]
+
+def largest_gaps(gaps, count):
+    """
+    Args:
+        gaps (iterable): (start, end) gaps
+        count (int): how many gaps to return
+
+    Return:
+        list: the longest (start, end) gaps, longest first, earlier gaps first among equally long ones
+    """
+    return nlargest(count, gaps, key=_gap_length)
+
+def smallest_gaps(gaps, count):
+    """
+    Args:
+        gaps (iterable): (start, end) gaps
+        count (int): how many gaps to return
+
+    Return:
+        list: the shortest (start, end) gaps, shortest first, earlier gaps first among equally short ones
+    """
+    return nsmallest(count, gaps, key=_gap_length)
+
+def iter_gaps_within(gaps, min_length=None, max_length=None):
+    """
+    Lazily keep the gaps whose length lies within a range, both ends included.
+
+    Args:
+        gaps (iterable): (start, end) gaps
+        min_length (int/float, optional): shortest length to keep, no minimum if not given
+        max_length (int/float, optional): longest length to keep, no maximum if not given
+
+    Yield:
+        tuple: the next (start, end) gap within the range
+    """
+    for gap in gaps:
+        length = gap[1] - gap[0]
+        if min_length is not None and length < min_length:
+            continue
+        if max_length is not None and length > max_length:
+            continue
+        yield gap
+
+def select_gap_arrays(gap_arrays, top_count=0, min_length=0):
+    """
+    Keep the gaps of a GapArrays at least min_length frames long, and of those the top_count longest.
+    The kept gaps stay in chronological order.
+
+    Args:
+        gap_arrays (GapArrays): parallel arrays of gap starts, ends and lengths
+        top_count (int, optional): how many of the longest gaps to keep, 0 to keep all of them
+        min_length (int/float, optional): shortest gap length to keep, 0 to keep all of them
+
+    Return:
+        GapArrays: the kept gaps
+    """
+    lengths = gap_arrays.lengths
+    if not min_length and (not top_count or top_count >= len(lengths)):
+        return gap_arrays
+
+    indexes = range(len(lengths))
+    if min_length:
+        indexes = [ind for ind in indexes if lengths[ind] >= min_length]
+    if top_count and top_count < len(indexes):
+        indexes = sorted(nlargest(top_count, indexes, key=lengths.__getitem__))
+    return GapArrays(*(array(column.typecode, [column[ind] for ind in indexes]) for column in gap_arrays))
+
+
+class GapHistogram(object):
+    """
+    Counts of gap lengths in fixed size buckets, filled in a single pass.
+    Memory grows with the number of distinct buckets, not with the number of gaps.
+    """
+
+    def __init__(self, bucket_size=1):
+        """
+        Args:
+            bucket_size (int/float, optional): length range each bucket covers, in frames
+        """
+        if bucket_size <= 0:
+            raise ValueError("Bucket size must be positive: {0}".format(bucket_size))
+        self.bucket_size = bucket_size
+        self.buckets = {}  # {bucket index: gap count}, bucket i holds lengths in [i * size, (i + 1) * size).
+        self.bucket_max_lengths = {}  # {bucket index: longest length counted in the bucket}
+        self.count = 0
+        self.total = 0
+        self.min_length = None
+        self.max_length = None
+
+    def add(self, length):
+        bucket = int(length // self.bucket_size)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        if bucket not in self.bucket_max_lengths or length > self.bucket_max_lengths[bucket]:
+            self.bucket_max_lengths[bucket] = length
+        self.count += 1
+        self.total += length
+        if self.min_length is None or length < self.min_length:
+            self.min_length = length
+        if self.max_length is None or length > self.max_length:
+            self.max_length = length
+
+    def add_gaps(self, gaps):
+        """
+        Args:
+            gaps (iterable): (start, end) gaps to count
+        """
+        for start, end in gaps:
+            self.add(end - start)
+        return self
+
+    @property
+    def mean(self):
+        """
+        float: mean gap length, None if no gap was counted
+        """
+        return float(self.total) / self.count if self.count else None
+
+    def bins(self):
+        """
+        Return:
+            list: (lowest length of the bucket, gap count) of each non-empty bucket, shortest first
+        """
+        return [(bucket * self.bucket_size, self.buckets[bucket]) for bucket in sorted(self.buckets)]
+
+    def percentile(self, percent):
+        """
+        Estimate a gap length percentile, accurate to one bucket size.
+
+        Args:
+            percent (int/float): percentile to estimate, from 0 to 100
+
+        Return:
+            int/float: the longest length counted in the bucket the percentile falls in,
+                       exact for whole-frame lengths and a bucket size of 1, or None if no gap was counted
+        """
+        if not self.count:
+            return None
+        rank = max(percent, 0) / 100.0 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return self.bucket_max_lengths[bucket]
+        return self.max_length
+
+    def percentiles(self, percents=DEFAULT_PERCENTILES):
+        """
+        Return:
+            dict: {percent: estimated gap length}
+        """
+        return dict((percent, self.percentile(percent)) for percent in percents)
+
+
+def gap_length_histogram(gaps, bucket_size=1):
+    """
+    Args:
+        gaps (iterable): (start, end) gaps
+        bucket_size (int/float, optional): length range each bucket covers, in frames
+
+    Return:
+        GapHistogram: the gap lengths, counted in buckets
+    """
+    return GapHistogram(bucket_size).add_gaps(gaps)
@@ -0,0 +1,473 @@
+"""
+Pure computation core for keyframe gaps.
+Nothing in here touches Nuke or Qt, so it can be imported, tested and benchmarked headless.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from heapq import merge, nlargest, nsmallest
+from itertools import chain, dropwhile, groupby, takewhile
+from math import floor
+from operator import sub
+
+from gapframes.constants import (DENSE_SEGMENT_MAX_STEP, DENSE_SEGMENT_MIN_KEYS, GAPFRAME_TARGET_DISTANCES,
+                                 NUM_TYPES)
+
+# Columnar representation of gaps: three parallel arrays of equal length.
+GapArrays = namedtuple("GapArrays", ["starts", "ends", "lengths"])
+# Columnar representation of dense segments, runs of keys at a constant step: parallel arrays of
+# each segment's first key, last key and the step between its keys.
+DenseSegments = namedtuple("DenseSegments", ["starts", "ends", "steps"])
+# How far apart two steps between sub-frame keys can be and still count as the same step.
+STEP_EPSILON = 1e-6
+
+
+def typecode_for(keys):
+    """
+    Pick an array typecode able to hold all keys without changing their type.
+    Integer keys stay integers so that the gaps built from them stay integers too.
+    """
+    return "d" if any(isinstance(key, float) for key in keys) else "l"
+
+def merge_key_arrays(key_arrays):
+    """
+    Merge any number of key frame sequences into one sorted array of unique key frames.
+
+    The per-knob key lists returned by Nuke are already sorted, so concatenating them and
+    sorting lets timsort detect each list as a run and do a k-way merge in C.
+
+    Args:
+        key_arrays (iterable): iterable of sequences of key frame numbers
+
+    Return:
+        array.array: sorted, de-duplicated key frame numbers
+    """
+    merged = sorted(chain.from_iterable(key_arrays))
+    unique = [key for key, _ in groupby(merged)]
+    return array(typecode_for(unique), unique)
+
+def iter_merged_keys(key_iterables):
+    """
+    Lazily merge any number of sorted key frame sequences into sorted unique key frames.
+    Only one key per sequence is held at a time, so memory grows with the number of sequences,
+    not with the number of keys.
+
+    Args:
+        key_iterables (iterable): iterable of sorted iterables of key frame numbers
+
+    Yield:
+        int/float: the next key frame number
+    """
+    for key, _ in groupby(merge(*key_iterables)):
+        yield key
+
+def _cluster_key(mean, tolerance):
+    whole = round(mean)
+    if abs(mean - whole) <= tolerance:
+        return int(whole)
+    return mean
+
+def merge_close_keys(keys, tolerance=0):
+    """
+    Collapse keys lying within a tolerance of each other into one key, in a single pass over the sorted keys.
+    Baked or retimed curves are full of near-coincident keys, e.g. 11.9999, 12.0 and 12.0001 across knobs,
+    which would otherwise each start a meaningless micro-gap.
+
+    Each run of keys no further than the tolerance from the run's first key becomes one key:
+    the whole frame the run sits on if there is one within the tolerance of the run's mean, else the mean.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        tolerance (int/float, optional): how close keys have to be to be merged, in frames, 0 to merge nothing
+
+    Return:
+        array.array: sorted, de-duplicated key frame numbers
+    """
+    if not tolerance or len(keys) < 2:
+        return keys if isinstance(keys, array) else array(typecode_for(keys), keys)
+    merged = list(iter_merged_close_keys(keys, tolerance))
+    return array(typecode_for(merged), merged)
+
+def iter_merged_close_keys(keys, tolerance=0):
+    """
+    Lazy version of merge_close_keys, for keys coming from an iterator.
+
+    Args:
+        keys (iterable): sorted, de-duplicated key frame numbers
+        tolerance (int/float, optional): how close keys have to be to be merged, in frames, 0 to merge nothing
+
+    Yield:
+        int/float: the next merged key frame number
+    """
+    if not tolerance:
+        for key in keys:
+            yield key
+        return
+
+    previous = None
+    run_start = None
+    run_sum = 0.0
+    run_count = 0
+    for key in chain(keys, [None]):
+        if key is not None and run_count and key - run_start <= tolerance:
+            run_sum += key
+            run_count += 1
+            continue
+
+        if run_count:
+            merged_key = _cluster_key(float(run_sum) / run_count, tolerance)
+            # Rounding to whole frames can land two neighbouring runs on the same frame.
+            if previous is None or merged_key > previous:
+                yield merged_key
+                previous = merged_key
+        run_start = key
+        run_sum = key
+        run_count = 1
+
+def clip_keys(keys, boundary_in=None, boundary_out=None):
+    """
+    Cut a sorted key array down to the keys that lie strictly between both boundaries.
+    If either boundary is missing, the keys are returned untouched.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        boundary_in (int, optional): keys at or below this number are dropped
+        boundary_out (int, optional): keys at or above this number are dropped
+
+    Return:
+        array.array: the keys within the boundaries
+    """
+    if boundary_in is None or boundary_out is None:
+        return keys
+    first = bisect_right(keys, boundary_in)
+    last = bisect_left(keys, boundary_out)
+    return keys[first:last]
+
+def clip_key_lists(key_lists, boundary_in=None, boundary_out=None):
+    """
+    Apply a scan boundary to several sorted key sequences, only if both boundaries are numbers.
+
+    Args:
+        key_lists (list): list of sorted sequences of key frame numbers
+        boundary_in (int, optional): keys at or below this number are dropped
+        boundary_out (int, optional): keys at or above this number are dropped
+
+    Return:
+        list: the key sequences within the boundaries
+    """
+    if not all(isinstance(obj, NUM_TYPES) for obj in (boundary_in, boundary_out)):
+        return key_lists
+    return [clip_keys(keys, boundary_in, boundary_out) for keys in key_lists]
+
+def iter_clipped_keys(keys, boundary_in=None, boundary_out=None):
+    """
+    Lazy version of clip_keys, for keys coming from an iterator.
+
+    Args:
+        keys (iterable): sorted key frame numbers
+        boundary_in (int, optional): keys at or below this number are dropped
+        boundary_out (int, optional): keys at or above this number are dropped
+
+    Return:
+        iterator: the keys within the boundaries
+    """
+    if not all(isinstance(obj, NUM_TYPES) for obj in (boundary_in, boundary_out)):
+        return iter(keys)
+    keys = dropwhile(lambda key: key <= boundary_in, keys)
+    return takewhile(lambda key: key < boundary_out, keys)
+
+def is_knob_scanned(knob_name, allow_knobs=None, exclude_knobs=None):
+    """
+    Check a knob name against the allowed and excluded knob names of a scan.
+
+    Args:
+        knob_name (str): name of the knob
+        allow_knobs (list, optional): if given, only these knob names are scanned
+        exclude_knobs (list, optional): knob names which are never scanned
+
+    Return:
+        bool: whether the knob should be scanned for keyframes
+    """
+    if allow_knobs and knob_name not in allow_knobs:
+        return False
+    if exclude_knobs and knob_name in exclude_knobs:
+        return False
+    return True
+
+def compile_knob_filters(allow_knobs=None, exclude_knobs=None):
+    """
+    Turn the allowed and excluded knob names of a scan into sets once, so each knob check is a single lookup.
+
+    Args:
+        allow_knobs (iterable, optional): if given, only these knob names are scanned
+        exclude_knobs (iterable, optional): knob names which are never scanned
+
+    Return:
+        tuple: (frozenset or None, frozenset or None), usable as is_knob_scanned's filters
+    """
+    allow_knobs = frozenset(allow_knobs) if allow_knobs else None
+    exclude_knobs = frozenset(exclude_knobs) if exclude_knobs else None
+    return allow_knobs, exclude_knobs
+
+def window_keys(keys, frame_in, frame_out):
+    """
+    Cut a sorted key array down to the keys within a frame window, both ends included.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        frame_in (int/float): first frame of the window
+        frame_out (int/float): last frame of the window
+
+    Return:
+        array.array: the keys within the window
+    """
+    return keys[bisect_left(keys, frame_in):bisect_right(keys, frame_out)]
+
+def iter_expanding_windows(keys, frame, growth=2):
+    """
+    Generate frame windows centred on a frame, starting with the smallest window that holds
+    the whole gap containing the frame, then growing geometrically until every key is covered.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        frame (int/float): frame the windows are centred on
+        growth (int/float, optional): how much each window is larger than the previous one
+
+    Yield:
+        tuple: (frame_in, frame_out) of the next window
+    """
+    if len(keys) < 2:
+        yield keys[0] if keys else frame, keys[-1] if keys else frame
+        return
+
+    # The keys around the frame bound the gap containing it, clamped to the first/last gap.
+    after = min(max(bisect_right(keys, frame), 1), len(keys) - 1)
+    radius = max(frame - keys[after - 1], keys[after] - frame, 1)
+    full_radius = max(frame - keys[0], keys[-1] - frame)
+    while radius < full_radius:
+        yield frame - radius, frame + radius
+        radius *= growth
+    yield frame - full_radius, frame + full_radius
+
+def compute_gaps(keys):
+    """
+    Find each chronological pair of neighbouring key frames.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+
+    Return:
+        GapArrays: parallel arrays of gap starts, ends and lengths
+    """
+    typecode = keys.typecode if isinstance(keys, array) else typecode_for(keys)
+    keys = array(typecode, keys)
+    starts = keys[:-1]
+    ends = keys[1:]
+    lengths = array(typecode, map(sub, ends, starts))
+    return GapArrays(starts, ends, lengths)
+
+def iter_dense_runs(keys, min_keys=DENSE_SEGMENT_MIN_KEYS, max_step=DENSE_SEGMENT_MAX_STEP):
+    """
+    Find the runs of keys at a constant step, in a single pass over the sorted keys.
+    Neighbouring runs can share a key, e.g. a run on ones followed by a run on twos.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        min_keys (int, optional): fewest keys a run needs to count as dense
+        max_step (int/float, optional): largest step between the keys of a dense run, in frames
+
+    Yield:
+        tuple: (index of the run's first key, index of its last key) of each dense run
+    """
+    run_first = 0
+    run_step = None
+    for ind in range(1, len(keys) + 1):
+        step = keys[ind] - keys[ind - 1] if ind < len(keys) else None
+        if step is not None and run_step is not None and abs(step - run_step) <= STEP_EPSILON:
+            continue
+
+        run_last = ind - 1
+        if run_step is not None and run_step <= max_step and run_last - run_first + 1 >= min_keys:
+            yield run_first, run_last
+        run_first = run_last
+        run_step = step
+
+def split_dense_segments(keys, min_keys=DENSE_SEGMENT_MIN_KEYS, max_step=DENSE_SEGMENT_MAX_STEP):
+    """
+    Find the gaps between sorted keys, collapsing each dense run of keys into one segment instead of
+    one gap per step. Baked trackers, cameras or mocap carry a key on every frame, which would otherwise
+    flood the gaps with 1 frame gaps.
+
+    Args:
+        keys (array.array): sorted, de-duplicated key frame numbers
+        min_keys (int, optional): fewest keys a run needs to be collapsed
+        max_step (int/float, optional): largest step between the keys of a collapsed run, in frames
+
+    Return:
+        tuple: (GapArrays of the gaps outside of any segment, DenseSegments)
+    """
+    gap_arrays = compute_gaps(keys)
+    typecode = gap_arrays.starts.typecode
+    runs = list(iter_dense_runs(keys, min_keys, max_step))
+    segments = DenseSegments(array(typecode), array(typecode), array(typecode))
+    if not runs:
+        return gap_arrays, segments
+
+    # Gap i lies between keys i and i + 1, so a run's gaps are the ones from its first to its last key.
+    kept = GapArrays(array(typecode), array(typecode), array(typecode))
+    previous_last = 0
+    for run_first, run_last in runs:
+        for column, kept_column in zip(gap_arrays, kept):
+            kept_column.extend(column[previous_last:run_first])
+        segments.starts.append(gap_arrays.starts[run_first])
+        segments.ends.append(gap_arrays.ends[run_last - 1])
+        segments.steps.append(gap_arrays.lengths[run_first])
+        previous_last = run_last
+    for column, kept_column in zip(gap_arrays, kept):
+        kept_column.extend(column[previous_last:])
+    return kept, segments
+
+def iter_key_gaps(keys):
+    """
+    Lazy version of compute_gaps, for keys coming from an iterator.
+
+    Args:
+        keys (iterable): sorted, de-duplicated key frame numbers
+
+    Yield:
+        tuple: (start, end) of the next gap
+    """
+    keys = iter(keys)
+    start = next(keys, None)
+    for end in keys:
+        yield start, end
+        start = end
+
+def iter_gaps(key_iterables, boundary_in=None, boundary_out=None, key_tolerance=0):
+    """
+    Stream the gaps between the keys of any number of sorted key sequences, e.g. one per knob,
+    merging and de-duplicating them on the fly. Neither the merged keys nor the gaps are ever stored,
+    so memory grows with the number of sequences only.
+
+    Args:
+        key_iterables (iterable): iterable of sorted iterables of key frame numbers
+        boundary_in (int, optional): keys at or below this number are dropped
+        boundary_out (int, optional): keys at or above this number are dropped
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see merge_close_keys
+
+    Return:
+        iterator: (start, end) of each gap, chronologically
+    """
+    keys = iter_clipped_keys(iter_merged_keys(key_iterables), boundary_in, boundary_out)
+    return iter_key_gaps(iter_merged_close_keys(keys, key_tolerance))
+
+def round_frame(frame):
+    """
+    Round a frame number to the whole frame it renders as, halves rounding up.
+    """
+    return int(floor(frame + 0.5))
+
+def gapframes(starts, ends, distance):
+    """
+    Find the gapframe of every gap at once, the frame a percentage of the way into the gap.
+
+    Args:
+        starts (array.array): gap start frames
+        ends (array.array): gap end frames
+        distance (int/float): percentage into each gap at which its gapframe lies
+
+    Return:
+        array.array: each gap's gapframe, rounded to whole frames, in the order of the gaps
+    """
+    fraction = distance / 100.0
+    return array("l", [round_frame(start + (end - start) * fraction) for start, end in zip(starts, ends)])
+
+def gapframe_targets(starts, ends, distances=GAPFRAME_TARGET_DISTANCES):
+    """
+    Find the whole frames to render to review every gap, at several Gap Distances.
+
+    Args:
+        starts (array.array): gap start frames
+        ends (array.array): gap end frames
+        distances (iterable, optional): percentages into each gap at which to place gapframes
+
+    Return:
+        array.array: sorted, de-duplicated frame numbers
+    """
+    return merge_key_arrays(gapframes(starts, ends, distance) for distance in distances)
+
+def format_frame_ranges(frames):
+    """
+    Describe whole frames as compactly as Nuke's FrameRanges syntax allows, e.g. "1-3 5 7-9",
+    which can be given straight to nuke.execute or a flipbook.
+
+    Args:
+        frames (iterable): sorted, de-duplicated whole frame numbers
+
+    Return:
+        str: space separated frames and first-last ranges of consecutive frames
+    """
+    ranges = []
+    first = last = None
+    for frame in chain(frames, [None]):
+        if frame is not None and last is not None and frame == last + 1:
+            last = frame
+            continue
+        if first is not None:
+            if first == last:
+                ranges.append(str(first))
+            elif first < 0:
+                # "-3--1" would be ambiguous, negative frames are listed one by one.
+                ranges.extend(str(negative) for negative in range(first, last + 1))
+            else:
+                ranges.append("{0}-{1}".format(first, last))
+        first = last = frame
+    return " ".join(ranges)
+
+def gap_pairs(gaps):
+    """
+    Return:
+        list: list of (start, end) tuples for each gap in a GapArrays
+    """
+    return list(zip(gaps.starts, gaps.ends))
+
+def largest_gap_index(gaps):
+    """
+    Return:
+        int: index of the first longest gap
+        or
+        NoneType: if there are no gaps
+    """
+    if not gaps.lengths:
+        return None
+    lengths = gaps.lengths
+    return max(range(len(lengths)), key=lengths.__getitem__)
+
+def smallest_gap_index(gaps):
+    """
+    Return:
+        int: index of the first shortest gap
+        or
+        NoneType: if there are no gaps
+    """
+    if not gaps.lengths:
+        return None
+    lengths = gaps.lengths
+    return min(range(len(lengths)), key=lengths.__getitem__)
+
+def top_gap_indexes(gaps, count, largest=True):
+    """
+    Find the indexes of the N longest (or shortest) gaps without sorting all of them.
+
+    Args:
+        gaps (GapArrays): gaps to pick from
+        count (int): how many gap indexes to return
+        largest (bool, optional): pick the longest gaps if True, else the shortest
+
+    Return:
+        list: gap indexes, ordered from the most to the least extreme gap
+    """
+    lengths = gaps.lengths
+    pick = nlargest if largest else nsmallest
+    return pick(count, range(len(lengths)), key=lengths.__getitem__)
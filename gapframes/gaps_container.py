@@ -1,12 +1,200 @@
-from operator import itemgetter
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, repeat
+from operator import gt, sub
 
-from gapframes.constants import NUM_TYPES, SAMPLE_GAPS_CONTAINER
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
 
+from gapframes.constants import GAPFRAME_TARGET_DISTANCES, NUM_TYPES, SAMPLE_GAPS_CONTAINER
+from gapframes.gaps import gapframe_targets, gapframes, typecode_for
 
-class GapsContainer(list):
+# Names of the sort orders a container can be viewed in.
+CHRONOLOGICAL = "chronological"
+LARGEST_GAP = "largest_gap"
+SMALLEST_GAP = "smallest_gap"
+REPR_TEMPLATE = "{0} - {1} ({2} frames)"
+DENSE_REPR_TEMPLATE = "{0} - {1} (dense, {2} keys every {3} frames)"
+# Most decimals shown for sub-frame numbers, trailing zeros are dropped.
+FRAME_DECIMALS = 4
+
+
+def format_frame(frame, padding=0):
+    """
+    Format a frame number, zero padded like "{0:04d}" does for whole frames,
+    with up to FRAME_DECIMALS decimals for sub-frames, e.g. "0012", "0012.25".
+
+    Args:
+        frame (int/float): the frame number
+        padding (int, optional): minimum width of the whole frame part, sign included
+
+    Return:
+        str: the formatted frame number
+    """
+    negative = frame < 0
+    text = "{0:.{decimals}f}".format(abs(frame), decimals=FRAME_DECIMALS).rstrip("0").rstrip(".")
+    whole, dot, fraction = text.partition(".")
+    whole = whole.zfill(padding - 1 if negative else padding)
+    return ("-" if negative else "") + whole + dot + fraction
+
+
+def _column_typecode(*columns):
+    """
+    Find the array typecode able to hold every number of the given columns.
+    """
+    for column in columns:
+        typecode = getattr(column, "typecode", None) or typecode_for(column)
+        if typecode == "d":
+            return "d"
+    return "l"
+
+
+def _interleave_segments(gap_arrays, dense_segments):
+    """
+    Merge gaps and the dense segments between them into chronological columns, segments having a non-zero step.
+
+    Return:
+        tuple: (starts, ends, steps) arrays
+    """
+    typecode = _column_typecode(gap_arrays.starts, dense_segments.starts)
+    gap_starts = array(typecode, gap_arrays.starts)
+    gap_ends = array(typecode, gap_arrays.ends)
+    starts, ends, steps = array(typecode), array(typecode), array(typecode)
+    previous = 0
+    for segment_start, segment_end, segment_step in zip(*dense_segments):
+        ind = bisect_left(gap_starts, segment_start, previous)
+        starts.extend(gap_starts[previous:ind])
+        ends.extend(gap_ends[previous:ind])
+        steps.extend(repeat(0, ind - previous))
+        starts.append(segment_start)
+        ends.append(segment_end)
+        steps.append(segment_step)
+        previous = ind
+    starts.extend(gap_starts[previous:])
+    ends.extend(gap_ends[previous:])
+    steps.extend(repeat(0, len(gap_starts) - previous))
+    return starts, ends, steps
+
+
+class GapRow(Mapping):
+    """
+    Read-only, dict-like view of a single gap stored in a GapsContainer.
+    Its "repr" string is only formatted when it is asked for.
+    """
+    __slots__ = ("_container", "_index")
+
+    def __init__(self, container, index):
+        """
+        Args:
+            container (GapsContainer): the container holding the gap data
+            index (int): index of the gap in the container's storage order
+        """
+        self._container = container
+        self._index = index
+
+    def __getitem__(self, key):
+        container = self._container
+        if key == "start":
+            return container.starts[self._index]
+        if key == "end":
+            return container.ends[self._index]
+        if key == "length":
+            return container.lengths[self._index]
+        if key == "repr":
+            return container.format_repr(self._index)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(SAMPLE_GAPS_CONTAINER)
+
+    def __len__(self):
+        return len(SAMPLE_GAPS_CONTAINER)
+
+    def __repr__(self):
+        return "GapRow({0!r}, {1!r})".format(self["start"], self["end"])
+
+
+class GapIntervalIndex(object):
     """
-    Modified Python list class containing convenience functionality to store and extract
-    information and string representation of keyframe gaps.
+    Chronologically sorted copy of non-overlapping gaps, answering frame lookups with bisect.
+    """
+
+    def __init__(self, starts, ends, chronological_order=None):
+        """
+        Args:
+            starts (array.array): gap start frames, in storage order
+            ends (array.array): gap end frames, in storage order
+            chronological_order (array.array, optional): storage indexes of the gaps in chronological order,
+                                                         None if storage order already is chronological
+        """
+        if chronological_order is not None:
+            starts = array(starts.typecode, [starts[ind] for ind in chronological_order])
+            ends = array(ends.typecode, [ends[ind] for ind in chronological_order])
+        self.starts = starts
+        self.ends = ends
+        self._chronological_order = chronological_order
+        self._gapframes = {}  # {distance: array of chronological gapframes}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def storage_index(self, position):
+        """
+        Map a chronological position to the index of the gap in storage order.
+        """
+        order = self._chronological_order
+        return position if order is None else order[position]
+
+    def gapframes(self, distance):
+        """
+        Return:
+            array.array: the gapframe of each gap in chronological order, rounded to whole frames,
+                         computed for all gaps at once and cached per distance
+        """
+        if distance not in self._gapframes:
+            self._gapframes[distance] = gapframes(self.starts, self.ends, distance)
+        return self._gapframes[distance]
+
+    def containing(self, frame):
+        """
+        Return:
+            int: chronological position of the first gap containing the frame, or None if none does
+        """
+        position = bisect_left(self.ends, frame)
+        if position < len(self) and self.starts[position] <= frame:
+            return position
+        return None
+
+    def next_after(self, frame, distance=0):
+        """
+        Return:
+            int: chronological position of the first gap whose gapframe lies after the frame,
+                 or None if there is none
+        """
+        # Gaps don't overlap, so their gapframes are sorted too.
+        position = bisect_right(self.gapframes(distance), frame)
+        return position if position < len(self) else None
+
+    def previous_before(self, frame, distance=0):
+        """
+        Return:
+            int: chronological position of the last gap whose gapframe lies before the frame,
+                 or None if there is none
+        """
+        position = bisect_left(self.gapframes(distance), frame)
+        return position - 1 if position > 0 else None
+
+
+class GapsContainer(object):
+    """
+    Columnar container to store and extract information and string representation of keyframe gaps.
+
+    Gap starts, ends and lengths live in parallel arrays. Sorting never moves the data, it only
+    switches which cached index permutation is used to present the rows.
+    Dense segments, runs of baked keys, are stored as rows with a non-zero step. They're listed once,
+    after every gap when sorting by length, and cycling skips them.
     """
     def __init__(self, items=None, repr_padding=4):
         """
@@ -17,27 +205,81 @@ class GapsContainer(list):
         """
         self.repr_padding = repr_padding
 
-        if items is None:
-            items = []
+        starts, ends = self._split_items(items or [])
+        self._set_columns(starts, ends)
+
+    @classmethod
+    def from_gap_arrays(cls, gap_arrays, repr_padding=4, dense_segments=None):
+        """
+        Build a container straight from the output of gaps.compute_gaps, without a per-gap round trip.
 
-        new_items = []
+        Args:
+            gap_arrays (GapArrays): parallel arrays of gap starts, ends and lengths
+            repr_padding (int, optional): an overall padding number for string representation
+                                          of keyframe gaps
+            dense_segments (DenseSegments, optional): segments found by gaps.split_dense_segments,
+                                                      to list between the gaps
+        """
+        container = cls(repr_padding=repr_padding)
+        if dense_segments is not None and len(dense_segments.starts):
+            container._set_columns(*_interleave_segments(gap_arrays, dense_segments))
+        else:
+            container._set_columns(gap_arrays.starts, gap_arrays.ends)
+        return container
+
+    @staticmethod
+    def _split_items(items):
+        """
+        Split incoming (start, end) pairs or entry dicts into a list of starts and a list of ends.
+        """
+        starts = []
+        ends = []
         for item in items:
-            self._check_item(item)
-            # We need to create an entry manually here because we're using the native list append method.
-            new_items.append(self.create_entry(item))
+            if isinstance(item, Mapping):
+                starts.append(item.get("start"))
+                ends.append(item.get("end"))
+            else:
+                assert len(item) == 2, "An input of 2 numbers is necessary."
+                starts.append(item[0])
+                ends.append(item[1])
+        return starts, ends
+
+    def _set_columns(self, starts, ends, steps=None):
+        """
+        Validate a whole batch of gap starts and ends at once and store them as the container's data.
+        Steps are the key steps of dense segments, 0 for gaps, all gaps if not given.
+        """
+        typecode = _column_typecode(starts, ends)
+        try:
+            # Building the arrays type checks every number in C.
+            starts = array(typecode, starts)
+            ends = array(typecode, ends)
+        except TypeError:
+            raise AssertionError("Frame numbers should be one of {0}.".format(NUM_TYPES))
+        steps = array(typecode, [0]) * len(starts) if steps is None else array(typecode, steps)
+        assert len(starts) == len(ends) == len(steps), "Every gap start needs a matching gap end."
+        assert all(map(gt, ends, starts)), "End number should be higher than start number."
 
-        super(GapsContainer, self).__init__(new_items)
+        self.starts = starts
+        self.ends = ends
+        self.lengths = array(typecode, map(sub, ends, starts))
+        self.steps = steps
+        self._has_dense = any(steps)
+        # Gaps coming from the gap engine are already chronological, which needs no permutation.
+        self._chronological_storage = all(start <= next_start for start, next_start in zip(starts, starts[1:]))
+        self._order_name = CHRONOLOGICAL
+        self._invalidate_orders()
 
     def _check_item(self, item):
         """
         Check that an incoming item is a dictionary with a signature as created by the create_entry function,
         or that it contains valid numbers for start and end of a range.
         """
-        if isinstance(item, dict):
+        if isinstance(item, Mapping):
             error_msg = ("Missing keys or invalid values in input dict. "
                          "Please refer to the create_entry docstring for valid signature.")
             for key, valid_types in SAMPLE_GAPS_CONTAINER.items():
-                assert item.has_key(key) and isinstance(item.get(key), valid_types), error_msg
+                assert key in item and isinstance(item.get(key), valid_types), error_msg
             return True  # Valid dict entry.
 
         assert len(item) == 2, "An input of 2 numbers is necessary."
@@ -50,6 +292,29 @@ class GapsContainer(list):
         assert end > start, "End number should be higher than start number."
         return True # Valid (start, end) entry.
 
+    def format_repr(self, index):
+        """
+        Format the string representation of a gap.
+
+        Args:
+            index (int): index of the gap in the container's storage order
+
+        Return:
+            str: e.g. "0010 - 0025 (15 frames)" or "0010.5 - 0025 (14.5 frames)",
+                 "0100 - 0250 (dense, 151 keys every 1 frames)" for a dense segment
+        """
+        step = self.steps[index]
+        if step:
+            padding = self.repr_padding
+            key_count = int(round(self.lengths[index] / step)) + 1
+            return DENSE_REPR_TEMPLATE.format(format_frame(self.starts[index], padding),
+                                              format_frame(self.ends[index], padding), key_count, format_frame(step))
+        return self._format_gap(self.starts[index], self.ends[index], self.lengths[index])
+
+    def _format_gap(self, start, end, length):
+        padding = self.repr_padding
+        return REPR_TEMPLATE.format(format_frame(start, padding), format_frame(end, padding), format_frame(length))
+
     def create_entry(self, gap):
         """
         Create a dict entry for a frame range gap, containing info about start/end frame,
@@ -67,39 +332,389 @@ class GapsContainer(list):
         gap_end = gap[1]
         gap_length = gap_end - gap_start
 
-        representation = "{0:0{padding}d} - {1:0{padding}d} ({2} frames)"
-        representation = representation.format(gap_start, gap_end, gap_length, padding=self.repr_padding)
+        representation = self._format_gap(gap_start, gap_end, gap_length)
 
         details = {"start": gap_start, "end": gap_end, "length": gap_length, "repr": representation}
         return details
 
     def append(self, item):
         """
-        Overwrite append func to ensure inputs match necessary signature,
-        and create an appropriate entry.
+        Ensure inputs match necessary signature and add them to the stored gaps.
 
         Args:
             item (iterable): an iterable of 2 numbers representing a start and end of a number range
         """
         self._check_item(item)
-        if not isinstance(item, dict):
-            item = self.create_entry(item)
-        super(GapsContainer, self).append(item)
+        if isinstance(item, Mapping):
+            item = (item.get("start"), item.get("end"))
+        start, end = item
+
+        if self.starts.typecode != "d" and (isinstance(start, float) or isinstance(end, float)):
+            # Upgrade integer storage so that it can hold float frames too.
+            self.starts = array("d", self.starts)
+            self.ends = array("d", self.ends)
+            self.lengths = array("d", self.lengths)
+            self.steps = array("d", self.steps)
+
+        if self.starts and start < self.starts[-1]:
+            self._chronological_storage = False
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lengths.append(end - start)
+        self.steps.append(0)
+        self._invalidate_orders()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, row):
+        """
+        Args:
+            row (int): row of the gap in the current sort order
+
+        Return:
+            GapRow: dict-like view of the gap
+        """
+        return GapRow(self, self.storage_index(row))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def storage_index(self, row):
+        """
+        Map a row of the current sort order to the index of the gap in storage order.
+        """
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("GapsContainer row out of range.")
+        order = self.display_order
+        return row if order is None else order[row]
+
+    def is_dense(self, row):
+        """
+        Return:
+            bool: whether the row of the current sort order is a dense segment rather than a gap
+        """
+        return bool(self.steps[self.storage_index(row)])
+
+    def skip_dense_rows(self, row, step=1):
+        """
+        Find the first row which is a gap, starting at a row and moving in steps, wrapping around the ends.
+
+        Args:
+            row (int): row of the current sort order to start at
+            step (int, optional): 1 to look forwards, -1 to look backwards
+
+        Return:
+            int: row of a gap, or the starting row if every row is a dense segment
+        """
+        if not self._has_dense:
+            return row
+        item_count = len(self)
+        for offset in range(item_count):
+            candidate = (row + offset * step) % item_count
+            if not self.steps[self.storage_index(candidate)]:
+                return candidate
+        return row
+
+    def gapframe(self, row, distance):
+        """
+        Args:
+            row (int): row of the gap in the current sort order
+            distance (int/float): percentage into the gap at which its gapframe lies
+
+        Return:
+            int: the gap's gapframe, rounded to a whole frame, taken from the precomputed gapframes
+        """
+        index = self.storage_index(row)
+        inverse = self._inverse_permutation(CHRONOLOGICAL)
+        position = index if inverse is None else inverse[index]
+        return self.interval_index.gapframes(distance)[position]
+
+    def gapframe_targets(self, distances=GAPFRAME_TARGET_DISTANCES):
+        """
+        Find the whole frames to render to review every gap, dense segments left out.
+
+        Args:
+            distances (iterable, optional): percentages into each gap at which to place gapframes
+
+        Return:
+            array.array: sorted, de-duplicated frame numbers, see gaps.format_frame_ranges
+        """
+        starts = self.interval_index.starts
+        ends = self.interval_index.ends
+        if self._has_dense:
+            steps = self.steps
+            is_gap = [not steps[self.interval_index.storage_index(position)] for position in range(len(starts))]
+            starts = array(starts.typecode, compress(starts, is_gap))
+            ends = array(ends.typecode, compress(ends, is_gap))
+        return gapframe_targets(starts, ends, distances)
+
+    def _skip_dense_positions(self, position, step):
+        """
+        Move a chronological position of the interval index off dense segments.
+
+        Return:
+            int: chronological position of a gap, or None if there is none in that direction
+        """
+        interval_index = self.interval_index
+        while position is not None and self.steps[interval_index.storage_index(position)]:
+            position += step
+            if not 0 <= position < len(interval_index):
+                return None
+        return position
+
+    def index(self, gap_row):
+        """
+        Find which row of the current sort order a GapRow of this container is on.
+        """
+        return self.row_for_storage_index(gap_row._index)
+
+    def row_for_storage_index(self, index):
+        """
+        Map the storage index of a gap to its row in the current sort order.
+        """
+        inverse = self._inverse_permutation(self._order_name)
+        return index if inverse is None else inverse[index]
+
+    def row_for_frame(self, frame):
+        """
+        Find the row of the gap containing a frame, in logarithmic time.
+        Frames before the first or after the last gap fall back to that first or last gap.
+
+        Args:
+            frame (int/float): frame number to look up
+
+        Return:
+            int: row in the current sort order
+            or
+            NoneType: if the container is empty
+        """
+        interval_index = self.interval_index
+        if not interval_index:
+            return None
+        position = interval_index.containing(frame)
+        if position is None:
+            position = 0 if frame <= interval_index.starts[0] else len(interval_index) - 1
+        return self.row_for_storage_index(interval_index.storage_index(position))
+
+    def next_row_after(self, frame, distance=0):
+        """
+        Find the row of the chronologically next gap, whose gapframe lies after a frame.
+        Dense segments are skipped.
+
+        Args:
+            frame (int/float): frame number to look up
+            distance (int/float, optional): percentage into each gap at which its gapframe lies
+
+        Return:
+            int: row in the current sort order
+            or
+            NoneType: if no gap lies after the frame
+        """
+        position = self._skip_dense_positions(self.interval_index.next_after(frame, distance), 1)
+        if position is None:
+            return None
+        return self.row_for_storage_index(self.interval_index.storage_index(position))
+
+    def previous_row_before(self, frame, distance=0):
+        """
+        Find the row of the chronologically previous gap, whose gapframe lies before a frame.
+        Dense segments are skipped.
+
+        Args:
+            frame (int/float): frame number to look up
+            distance (int/float, optional): percentage into each gap at which its gapframe lies
+
+        Return:
+            int: row in the current sort order
+            or
+            NoneType: if no gap lies before the frame
+        """
+        position = self._skip_dense_positions(self.interval_index.previous_before(frame, distance), -1)
+        if position is None:
+            return None
+        return self.row_for_storage_index(self.interval_index.storage_index(position))
+
+    @property
+    def sort_order(self):
+        """
+        str: name of the sort order the rows are currently presented in
+        """
+        return self._order_name
+
+    @property
+    def display_order(self):
+        """
+        array.array: storage indexes of the gaps in the current sort order,
+                     or None if the rows are presented in storage order
+        """
+        return self._permutation(self._order_name)
+
+    @property
+    def interval_index(self):
+        """
+        GapIntervalIndex: chronological index of the gaps, built on first use
+        """
+        if self._interval_index is None:
+            self._interval_index = GapIntervalIndex(self.starts, self.ends,
+                                                    self._permutation(CHRONOLOGICAL))
+        return self._interval_index
+
+    def _invalidate_orders(self):
+        """
+        Drop every cached permutation and index, they get rebuilt on next access.
+        """
+        self._orders = {}
+        self._inverse_orders = {}
+        self._interval_index = None
+
+    def _permutation(self, order_name):
+        """
+        Return:
+            array.array: storage indexes of the gaps in the given sort order,
+                         or None if that order is the storage order
+        """
+        if order_name == CHRONOLOGICAL and self._chronological_storage:
+            return None
+
+        if order_name not in self._orders:
+            indexes = range(len(self))
+            if order_name == LARGEST_GAP:
+                permutation = sorted(indexes, key=self.lengths.__getitem__, reverse=True)
+            elif order_name == SMALLEST_GAP:
+                permutation = sorted(indexes, key=self.lengths.__getitem__)
+            else:
+                permutation = sorted(indexes, key=self.starts.__getitem__)
+            if self._has_dense and order_name != CHRONOLOGICAL:
+                # Dense segments aren't gaps, keep them out of the way of the gaps being sorted.
+                steps = self.steps
+                permutation = ([ind for ind in permutation if not steps[ind]] +
+                               [ind for ind in permutation if steps[ind]])
+            self._orders[order_name] = array("l", permutation)
+        return self._orders[order_name]
+
+    def _inverse_permutation(self, order_name):
+        """
+        Return:
+            array.array: row of each storage index in the given sort order,
+                         or None if that order is the storage order
+        """
+        permutation = self._permutation(order_name)
+        if permutation is None:
+            return None
+
+        if order_name not in self._inverse_orders:
+            inverse = array("l", permutation)
+            for row, index in enumerate(permutation):
+                inverse[index] = row
+            self._inverse_orders[order_name] = inverse
+        return self._inverse_orders[order_name]
+
+    def _apply_order(self, order_name):
+        """
+        Switch which sort order the rows are presented in. The data itself never moves.
+        """
+        self._order_name = order_name
 
     def sort_chronologically(self):
         """
-        Sort the list chronologically, by the stored dict information about the gap's start frame.
+        Present the rows chronologically, by each gap's start frame.
         """
-        self.sort(key=itemgetter("start"))
+        self._apply_order(CHRONOLOGICAL)
 
     def sort_by_largest_gap(self):
         """
-        Sort the list by the largest number stored in each dict's "length" key.
+        Present the rows by the largest gap length first.
         """
-        self.sort(key=itemgetter("length"), reverse=True)
+        self._apply_order(LARGEST_GAP)
 
     def sort_by_smallest_gap(self):
         """
-        Sort the list by the smallest number stored in each dict's "length" key.
+        Present the rows by the smallest gap length first.
         """
-        self.sort(key=itemgetter("length"))
+        self._apply_order(SMALLEST_GAP)
+
+
+class GapCursor(object):
+    """
+    Current gap of a GapsContainer, moved one row at a time in constant time, to cycle through gaps
+    without a view over them. It holds the gap's storage index, so it stays on its gap when the container is re-sorted.
+    """
+
+    def __init__(self, container=None):
+        self.container = container if container is not None else GapsContainer()
+        self._index = None
+
+    def set_container(self, container, row=None):
+        """
+        Args:
+            container (GapsContainer): the gaps to cycle through, an empty container if None
+            row (int, optional): row of the current sort order to start on, no current gap if not given
+        """
+        self.container = container if container is not None else GapsContainer()
+        self.row = row
+
+    @property
+    def row(self):
+        """
+        int: row of the current gap in the container's current sort order, None if there is no current gap
+        """
+        if self._index is None:
+            return None
+        return self.container.row_for_storage_index(self._index)
+
+    @row.setter
+    def row(self, row):
+        if row is None or not 0 <= row < len(self.container):
+            self._index = None
+        else:
+            self._index = self.container.storage_index(row)
+
+    def gapframe(self, distance):
+        """
+        Return:
+            int: the current gap's gapframe, see GapsContainer.gapframe, None if there is no current gap
+        """
+        row = self.row
+        return None if row is None else self.container.gapframe(row, distance)
+
+    def cycle(self, step, frame=None, distance=0):
+        """
+        Move to the next or previous gap, wrapping around the ends. Dense segments are skipped.
+        If the rows are chronological and a frame is given, e.g. the playhead after it was moved off
+        the current gapframe, cycling continues along the timeline from that frame instead.
+
+        Args:
+            step (int): 1 to cycle to the next row, -1 to cycle to the previous one
+            frame (int/float, optional): frame to continue from, in chronological order
+            distance (int/float, optional): percentage into each gap at which its gapframe lies
+
+        Return:
+            int: the new current row, None if the container is empty
+        """
+        container = self.container
+        item_count = len(container)
+        if not item_count:
+            return None
+
+        new_row = None
+        if frame is not None and container.sort_order == CHRONOLOGICAL:
+            if step > 0:
+                new_row = container.next_row_after(frame, distance)
+            else:
+                new_row = container.previous_row_before(frame, distance)
+            if new_row is None:
+                # Nothing further along the timeline, wrap around.
+                new_row = 0 if step > 0 else item_count - 1
+
+        if new_row is None:
+            row = self.row
+            if row is None:
+                row = -1 if step > 0 else 0
+            new_row = (row + step) % item_count
+        new_row = container.skip_dense_rows(new_row, step)
+        self._index = container.storage_index(new_row)
+        return new_row
@@ -0,0 +1,119 @@
+"""
+Size-capped LRU cache of keyframe arrays, keyed by (node name, knob name).
+Nothing in here touches Nuke, invalidation is driven from the outside.
+"""
+from collections import OrderedDict
+
+# Rough per-entry cost on top of the key data itself: the key tuple, the entry tuple and the array header.
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class KeyCache(object):
+    """
+    Least recently used cache of key arrays, capped by entry count and by an estimate of its size in bytes.
+    Each entry can carry a fingerprint; looking an entry up with a different fingerprint counts as a miss.
+    """
+
+    def __init__(self, max_entries=20000, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int, optional): maximum number of cached knobs
+            max_bytes (int, optional): maximum estimated memory taken up by the cache
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # {(node_name, knob_name): (fingerprint, keys, size)}
+        self._node_knobs = {}  # {node_name: set of knob names}, for invalidating whole nodes.
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        """
+        int: estimated memory taken up by the cached keys
+        """
+        return self._bytes
+
+    def get(self, key, fingerprint=None):
+        """
+        Args:
+            key (tuple): (node name, knob name)
+            fingerprint (hashable, optional): cheap summary of the knob's current animation
+
+        Return:
+            array.array: the cached keys
+            or
+            NoneType: if nothing is cached for the key, or it was cached with another fingerprint
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+
+        # Mark as most recently used.
+        del self._entries[key]
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, keys, fingerprint=None):
+        """
+        Cache the keys of a knob, evicting the least recently used entries if over budget.
+
+        Args:
+            key (tuple): (node name, knob name)
+            keys (array.array): sorted key frame numbers of the knob
+            fingerprint (hashable, optional): cheap summary of the knob's current animation
+        """
+        self.invalidate(key)
+        size = ENTRY_OVERHEAD_BYTES + (keys.itemsize * len(keys))
+        self._entries[key] = (fingerprint, keys, size)
+        self._node_knobs.setdefault(key[0], set()).add(key[1])
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest_key = next(iter(self._entries))
+            self.invalidate(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Drop the cached keys of a single knob, if any.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+        node_name, knob_name = key
+        knob_names = self._node_knobs.get(node_name)
+        if knob_names is not None:
+            knob_names.discard(knob_name)
+            if not knob_names:
+                del self._node_knobs[node_name]
+
+    def invalidate_node(self, node_name):
+        """
+        Drop the cached keys of every knob of a node.
+        """
+        for knob_name in list(self._node_knobs.get(node_name, ())):
+            self.invalidate((node_name, knob_name))
+
+    def clear(self):
+        self._entries.clear()
+        self._node_knobs.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """
+        Return:
+            dict: hit/miss/eviction counters and current occupancy of the cache
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self._bytes}
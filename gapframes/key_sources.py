@@ -0,0 +1,122 @@
+"""
+Keys tagged with the (node name, knob name) sources they come from, in the same merge as the keys themselves.
+Lets each gap report which nodes and knobs place the keys bounding it, without rescanning any node.
+Nothing in here touches Nuke or Qt.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+from gapframes.gaps import GapArrays, merge_key_arrays
+
+
+def _source_label(source):
+    node_name, knob_name = source
+    return node_name if knob_name is None else "{0}.{1}".format(node_name, knob_name)
+
+
+class KeySources(object):
+    """
+    Sorted unique keys, each with the ids of the sources holding a key on that frame.
+    Stored as compressed rows: the source ids of keys[i] are source_ids[offsets[i]:offsets[i + 1]],
+    indexes into sources, in source order. So the tags cost one integer per source key, not a container per key.
+    """
+
+    def __init__(self, tagged_key_arrays=()):
+        """
+        Args:
+            tagged_key_arrays (iterable, optional): (source, sorted keys) pairs, where source is a
+                (node name, knob name) tuple, knob name being None if only the node is known
+        """
+        tagged_key_arrays = list(tagged_key_arrays)
+        self.sources = [source for source, _ in tagged_key_arrays]
+        # The same merge as for untagged keys, then each source's keys are placed in the rows of the merged
+        # keys they land on, with a counting sort. Far cheaper than merging (key, source) pairs one at a time.
+        self.keys = merge_key_arrays(keys for _, keys in tagged_key_arrays)
+        position = dict((key, ind) for ind, key in enumerate(self.keys))
+
+        self.offsets = array("l", [0]) * (len(self.keys) + 1)
+        for _, keys in tagged_key_arrays:
+            for key in keys:
+                self.offsets[position[key] + 1] += 1
+        for ind in range(1, len(self.offsets)):
+            self.offsets[ind] += self.offsets[ind - 1]
+
+        self.source_ids = array("l", [0]) * self.offsets[-1]
+        free_slots = array("l", self.offsets)
+        for source_id, (_, keys) in enumerate(tagged_key_arrays):
+            for key in keys:
+                ind = position[key]
+                self.source_ids[free_slots[ind]] = source_id
+                free_slots[ind] += 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def node_names(self):
+        """
+        Return:
+            list: sorted names of the nodes the keys come from
+        """
+        return sorted(set(node_name for node_name, _ in self.sources))
+
+    def _key_range(self, frame, tolerance=0):
+        return bisect_left(self.keys, frame - tolerance), bisect_right(self.keys, frame + tolerance)
+
+    def sources_at(self, frame, tolerance=0):
+        """
+        Args:
+            frame (int/float): frame to look up, e.g. the start or end of a gap
+            tolerance (int/float, optional): also include the sources of keys this many frames away,
+                for gaps built from keys merged with gaps.merge_close_keys
+
+        Return:
+            list: (node name, knob name) sources with a key on the frame, in source order
+        """
+        first, last = self._key_range(frame, tolerance)
+        source_ids = sorted(set(self.source_ids[self.offsets[first]:self.offsets[last]]))
+        return [self.sources[source_id] for source_id in source_ids]
+
+    def nodes_at(self, frame, tolerance=0):
+        """
+        Return:
+            set: names of the nodes with a key on the frame
+        """
+        return set(node_name for node_name, _ in self.sources_at(frame, tolerance))
+
+    def gap_sources(self, start, end, tolerance=0):
+        """
+        Return:
+            tuple: (sources of the gap's start key, sources of its end key), see sources_at
+        """
+        return self.sources_at(start, tolerance), self.sources_at(end, tolerance)
+
+    def format_gap_sources(self, start, end, tolerance=0):
+        """
+        Return:
+            str: one line per bounding key of the gap, listing the node.knob sources holding it
+        """
+        start_sources, end_sources = self.gap_sources(start, end, tolerance)
+        return "\n".join("{0} {1}: {2}".format(label, frame, ", ".join(_source_label(source) for source in sources))
+                         for label, frame, sources in (("Start", start, start_sources), ("End", end, end_sources)))
+
+
+def gaps_bounded_by(gap_arrays, keys, tolerance=0):
+    """
+    Keep the gaps whose start or end key is one of the given keys, e.g. the keys of a single node.
+
+    Args:
+        gap_arrays (GapArrays): parallel arrays of gap starts, ends and lengths
+        keys (array.array): sorted keys the kept gaps must start or end on
+        tolerance (int/float, optional): how far from one of the keys a gap's bound can be and still count
+
+    Return:
+        GapArrays: the kept gaps, in their original order
+    """
+    def on_key(frame):
+        return bisect_right(keys, frame + tolerance) > bisect_left(keys, frame - tolerance)
+
+    indexes = [ind for ind, (start, end) in enumerate(zip(gap_arrays.starts, gap_arrays.ends))
+               if on_key(start) or on_key(end)]
+    if len(indexes) == len(gap_arrays.starts):
+        return gap_arrays
+    return GapArrays(*(array(column.typecode, [column[ind] for ind in indexes]) for column in gap_arrays))
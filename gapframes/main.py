@@ -1,35 +1,63 @@
 """
 Main actions live here.
+The panel is only built the first time an action needs it, cycling through gaps doesn't need it.
 """
-from PySide2.QtWidgets import QApplication
+import weakref
 
 # gapframes imports
-from gapframes.constants import PANEL_OBJECT_NAME
 from gapframes.ui.communicator import COMMUNICATOR
-from gapframes.ui.panel import GapframesPanel
+from gapframes.ui.navigator import NAVIGATOR
+
+_panel_ref = None
 
 
 def _initialize_panel():
+    global _panel_ref
+    # Imported here, loading the panel module pulls in most of PySide2.
+    from gapframes.ui.panel import GapframesPanel
+
     panel = GapframesPanel()
+    # The Communicator's connections to the panel are what keep it alive, this only tracks it.
     panel.connect_communicator(COMMUNICATOR)
-
-_initialize_panel()
+    panel.destroyed.connect(_forget_panel)
+    _panel_ref = weakref.ref(panel)
+    return panel
+
+def _forget_panel(*args):
+    global _panel_ref
+    _panel_ref = None
+    # The panel's gaps go with it, the navigator reads the sidecar again.
+    NAVIGATOR.set_container(None)
+
+def get_panel(create=True):
+    """
+    Args:
+        create (bool, optional): whether to build the panel if it doesn't exist yet
+
+    Return:
+        GapframesPanel: the panel, or None if it doesn't exist and create is False
+    """
+    panel = _panel_ref() if _panel_ref is not None else None
+    if panel is None and create:
+        # If panel was never built, or was somehow destroyed, initialize it.
+        panel = _initialize_panel()
+    return panel
 
 def open_panel():
-    active_widgets = [w.objectName() for w in QApplication.instance().allWidgets()]
-    if PANEL_OBJECT_NAME not in active_widgets:
-        # If panel was somehow destroyed, re-initialize it.
-        _initialize_panel()
+    get_panel()
     COMMUNICATOR.show_gapframes_panel()
 
 def cycle_next_gapframe():
-    COMMUNICATOR.emit_cycle_next()
+    NAVIGATOR.cycle(1)
 
 def cycle_prev_gapframe():
-    COMMUNICATOR.emit_cycle_prev()
+    NAVIGATOR.cycle(-1)
 
 def cycle_gap_distance():
+    get_panel()
     COMMUNICATOR.emit_cycle_gap_distance()
 
 def update_gap_list():
+    get_panel()
     COMMUNICATOR.emit_update_gap_list()
+
@@ -0,0 +1,190 @@
+"""
+Read keyframes straight out of plain-text .nk scripts, without Nuke.
+Only what's needed to find animation is understood: node blocks, group nesting, knob lines and
+the "curve" values inside them. Scripts are read line by line, so memory use doesn't grow with file size.
+"""
+import io
+import mmap
+import re
+
+from gapframes import gaps
+
+# Nodes whose block is followed by their child nodes and a closing "end_group" line.
+GROUP_CLASSES = ("Group", "LiveGroup", "Gizmo")
+# Nuke starts an animation curve at frame 1 unless the curve says otherwise with an "x<frame>" token.
+CURVE_START_FRAME = 1
+
+_CURVE_RE = re.compile(r"\{curve([^{}]*)\}")
+_NODE_START_RE = re.compile(r"^(\S+)(?: .*)? \{$")
+_TOP_LEVEL_RE = re.compile(br"^(?:(\S+)(?: [^\n]*)? \{|end_group)\r?$", re.MULTILINE)
+
+
+def parse_curve(curve_body):
+    """
+    Find the key frames of one animation curve.
+
+    Args:
+        curve_body (str): the tokens of a "{curve ...}" value, without the braces and "curve" word,
+                          e.g. "K x1 0 x10 25 30"
+
+    Return:
+        list: sorted key frame numbers
+    """
+    frames = []
+    frame = CURVE_START_FRAME
+    for token in curve_body.split():
+        if token[0] == "x":
+            # Sets the frame of the next key.
+            frame = float(token[1:])
+            continue
+        try:
+            float(token)
+        except ValueError:
+            # Interpolation flags and slope/tangent tokens, which don't add keys.
+            continue
+        frames.append(int(frame) if frame.is_integer() else frame)
+        frame += 1
+    return frames
+
+def _brace_balance(text):
+    """
+    Count opened minus closed braces, ignoring escaped braces and braces inside double quotes.
+    """
+    balance = 0
+    in_quotes = False
+    escaped = False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            in_quotes = not in_quotes
+        elif in_quotes:
+            continue
+        elif char == "{":
+            balance += 1
+        elif char == "}":
+            balance -= 1
+    return balance
+
+def iter_script_lines(path, start=0, end=None):
+    """
+    Read the lines of a script one at a time, optionally only within a byte range.
+
+    Args:
+        path (str): path to the .nk script
+        start (int, optional): byte offset to start reading at, should be the start of a line
+        end (int, optional): byte offset to stop reading at, reads to the end of the file if None
+
+    Yield:
+        str: the next line, without its trailing line break
+    """
+    with io.open(path, "rb") as script:
+        script.seek(start)
+        position = start
+        for line in script:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line.decode("utf-8", "replace").rstrip("\r\n")
+
+def iter_knob_keys(lines, allow_knobs=None, exclude_knobs=None):
+    """
+    Parse script lines and find the keys of every animated knob, in script order.
+
+    Args:
+        lines (iterable): lines of a .nk script
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+
+    Yield:
+        tuple: (full node name, knob name, sorted list of key frame numbers)
+    """
+    group_names = []
+    node_class = None  # Class of the node whose block is currently open.
+    node_name = None
+    node_knobs = []  # [(knob name, keys)] of the open node, its name usually comes after its knobs.
+    pending = None  # [knob name, value parts, brace balance] of a knob value spanning several lines.
+
+    for line in lines:
+        stripped = line.strip()
+
+        if pending is not None:
+            pending[1].append(stripped)
+            pending[2] += _brace_balance(stripped)
+            if pending[2] > 0:
+                continue
+            knob_name, value = pending[0], " ".join(pending[1])
+            pending = None
+        elif node_class is None:
+            if stripped == "end_group":
+                if group_names:
+                    group_names.pop()
+                continue
+            match = _NODE_START_RE.match(stripped)
+            if match:
+                node_class = match.group(1)
+                node_name = None
+                node_knobs = []
+            continue
+        elif stripped == "}":
+            full_name = ".".join(group_names + [node_name or node_class])
+            for knob_name, keys in node_knobs:
+                yield full_name, knob_name, keys
+            if node_class in GROUP_CLASSES:
+                group_names.append(node_name or node_class)
+            node_class = None
+            continue
+        else:
+            knob_name, _, value = stripped.partition(" ")
+            if knob_name == "name":
+                node_name = value.strip('"')
+                continue
+            balance = _brace_balance(value)
+            if balance > 0:
+                pending = [knob_name, [value], balance]
+                continue
+
+        if "curve" not in value or not gaps.is_knob_scanned(knob_name, allow_knobs, exclude_knobs):
+            continue
+        curve_keys = [parse_curve(body) for body in _CURVE_RE.findall(value)]
+        if curve_keys:
+            node_knobs.append((knob_name, gaps.merge_key_arrays(curve_keys).tolist()))
+
+def split_script(path, chunk_size):
+    """
+    Split a script into byte ranges of roughly chunk_size bytes, each starting at a top-level node,
+    so that the ranges can be parsed independently. Group contents are never split up.
+
+    Args:
+        path (str): path to the .nk script
+        chunk_size (int): preferred size of each range in bytes
+
+    Return:
+        list: list of (start, end) byte offsets, end being None for the last range
+    """
+    with io.open(path, "rb") as script:
+        try:
+            data = mmap.mmap(script.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file, can't be mapped.
+            return [(0, None)]
+        try:
+            starts = [0]
+            depth = 0
+            for match in _TOP_LEVEL_RE.finditer(data):
+                node_class = match.group(1)
+                if node_class is None:
+                    depth = max(depth - 1, 0)
+                    continue
+                if depth == 0 and match.start() - starts[-1] >= chunk_size:
+                    starts.append(match.start())
+                if node_class.decode("utf-8", "replace") in GROUP_CLASSES:
+                    depth += 1
+        finally:
+            data.close()
+
+    ends = starts[1:] + [None]
+    return list(zip(starts, ends))
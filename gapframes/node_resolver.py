@@ -0,0 +1,138 @@
+"""
+Resolves which nodes a scan should look at, with memoized group contents and Properties Bin membership.
+Nuke callbacks keep the memoized data in sync with node creation, deletion and Properties panels opening.
+"""
+from collections import OrderedDict
+
+import nuke
+
+# Classes of selected nodes whose contents get scanned too.
+GROUP_CLASSES = ("Group",)
+
+
+def unique_nodes(nodes):
+    """
+    Drop repeated nodes, keeping the first occurrence of each.
+
+    Args:
+        nodes (iterable): Nuke Node objects
+
+    Return:
+        list: the nodes, each one only once, in their original order
+    """
+    seen = set()
+    result = []
+    for node in nodes:
+        name = node.fullName()
+        if name not in seen:
+            seen.add(name)
+            result.append(node)
+    return result
+
+
+class NodeResolver(object):
+    """
+    Single-traversal node lookups for each of the panel's node selection modes.
+    """
+
+    def __init__(self):
+        self._callbacks_registered = False
+        self._all_nodes = None  # Every node of the script, recursing groups.
+        self._group_descendants = {}  # {group full name: tuple of nodes inside, recursing groups}
+        self._shown_nodes = None  # OrderedDict {full name: node} of nodes with an open Properties panel.
+
+    def register_callbacks(self):
+        """
+        Keep the memoized data up to date from Nuke callbacks. Safe to call more than once.
+        """
+        if self._callbacks_registered:
+            return
+        nuke.addOnCreate(self._on_node_created, nodeClass="*")
+        nuke.addOnDestroy(self._on_node_destroyed, nodeClass="*")
+        nuke.addKnobChanged(self._on_knob_changed, nodeClass="*")
+        self._callbacks_registered = True
+
+    def invalidate(self):
+        """
+        Forget everything memoized about the script's node graph.
+        """
+        self._all_nodes = None
+        self._group_descendants = {}
+
+    def _on_node_created(self):
+        self.invalidate()
+
+    def _on_node_destroyed(self):
+        self.invalidate()
+        if self._shown_nodes is not None:
+            self._shown_nodes.pop(nuke.thisNode().fullName(), None)
+
+    def _on_knob_changed(self):
+        if self._shown_nodes is None:
+            return
+        knob_name = nuke.thisKnob().name()
+        if knob_name == "showPanel":
+            node = nuke.thisNode()
+            self._shown_nodes[node.fullName()] = node
+        elif knob_name == "hidePanel":
+            self._shown_nodes.pop(nuke.thisNode().fullName(), None)
+
+    def all_nodes(self):
+        """
+        Return:
+            list: every node of the script, recursing groups
+        """
+        self.register_callbacks()
+        if self._all_nodes is None:
+            self._all_nodes = unique_nodes(nuke.allNodes(recurseGroups=True))
+        return self._all_nodes
+
+    def group_descendants(self, group):
+        """
+        Args:
+            group (Nuke Node): a Group node
+
+        Return:
+            tuple: every node inside the group, recursing nested groups
+        """
+        self.register_callbacks()
+        group_name = group.fullName()
+        descendants = self._group_descendants.get(group_name)
+        if descendants is None:
+            descendants = tuple(unique_nodes(nuke.allNodes(group=group, recurseGroups=True)))
+            self._group_descendants[group_name] = descendants
+        return descendants
+
+    def expand_groups(self, nodes):
+        """
+        Args:
+            nodes (iterable): Nuke Node objects
+
+        Return:
+            list: the nodes followed by the contents of any groups among them, each node only once
+        """
+        expanded = []
+        for node in nodes:
+            expanded.append(node)
+            if node.Class() in GROUP_CLASSES:
+                expanded.extend(self.group_descendants(node))
+        return unique_nodes(expanded)
+
+    def shown_nodes(self):
+        """
+        Return:
+            list: nodes whose Properties panel is open, in the order their panels were opened
+        """
+        self.register_callbacks()
+        if self._shown_nodes is None:
+            # Seed once, callbacks keep it up to date afterwards.
+            self._shown_nodes = OrderedDict((n.fullName(), n) for n in self.all_nodes() if n.shown())
+
+        # Double check, in case a panel was closed without a callback being fired.
+        closed = [name for name, node in self._shown_nodes.items() if not node.shown()]
+        for name in closed:
+            del self._shown_nodes[name]
+        return list(self._shown_nodes.values())
+
+
+NODE_RESOLVER = NodeResolver()
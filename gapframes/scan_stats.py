@@ -0,0 +1,125 @@
+"""
+Bookkeeping collected while scanning nodes for keyframes.
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+from heapq import heappush, heappushpop
+from timeit import default_timer
+
+from gapframes.constants import SLOWEST_NODES_COUNT
+
+# Phases of a Gaps List update, in the order they happen.
+PHASE_RESOLVE = "resolve nodes"
+PHASE_SCAN = "scan knobs"
+PHASE_MERGE = "merge keys"
+PHASE_GAPS = "build gaps"
+PHASE_VIEW = "fill list"
+
+
+class ScanStats(object):
+    """
+    Counters filled in by the keyframe scanning functions in utils, one instance per scan.
+    """
+
+    def __init__(self, slowest_count=SLOWEST_NODES_COUNT):
+        """
+        Args:
+            slowest_count (int, optional): how many of the slowest nodes to keep track of
+        """
+        self.nodes_scanned = 0
+        # Nodes whose keys were taken from the script's sidecar instead of being scanned.
+        self.nodes_reused = 0
+        # Names of the nodes whose keys could only be read with their Properties panel open.
+        self.slow_path_nodes = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.knobs_scanned = 0
+        self.keys_found = 0
+        self.phase_times = OrderedDict()  # {phase name: seconds}, phases can be timed in several spans.
+        self.slowest_count = slowest_count
+        self._slowest_nodes = []  # Min-heap of (seconds, node name).
+
+    def record_cache_lookup(self, hit):
+        """
+        Args:
+            hit (bool): whether a knob's keys were found in the keyframe cache
+        """
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def add_phase_time(self, phase, seconds):
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, phase):
+        """
+        Time the body of a with statement, adding its duration to a phase.
+
+        Args:
+            phase (str): name of the phase, one of the PHASE_ constants
+        """
+        start = default_timer()
+        try:
+            yield
+        finally:
+            self.add_phase_time(phase, default_timer() - start)
+
+    def record_node_time(self, node_name, seconds):
+        """
+        Remember how long a node took to scan, if it's one of the slowest so far.
+        """
+        entry = (seconds, node_name)
+        if len(self._slowest_nodes) < self.slowest_count:
+            heappush(self._slowest_nodes, entry)
+        else:
+            heappushpop(self._slowest_nodes, entry)
+
+    @property
+    def slow_path_count(self):
+        """
+        int: how many nodes needed their Properties panel opened to be scanned
+        """
+        return len(self.slow_path_nodes)
+
+    @property
+    def slowest_nodes(self):
+        """
+        list: (node name, seconds) of the slowest nodes to scan, slowest first
+        """
+        return [(node_name, seconds) for seconds, node_name in sorted(self._slowest_nodes, reverse=True)]
+
+    def summary(self):
+        """
+        Return:
+            str: one line description of the scan
+        """
+        return ("Scanned {0} node(s), {1} needed their Properties panel opened, {2} reused from the sidecar. "
+                "Keyframe cache: {3} hit(s), {4} miss(es).").format(
+            self.nodes_scanned, self.slow_path_count, self.nodes_reused, self.cache_hits, self.cache_misses)
+
+    def timing_summary(self):
+        """
+        Return:
+            str: one line description of where the time of the scan went
+        """
+        phases = ", ".join("{0} {1:.1f} ms".format(phase, seconds * 1000.0)
+                           for phase, seconds in self.phase_times.items())
+        line = "{0} | {1} node(s), {2} knob(s), {3} key(s)".format(
+            phases or "no phases timed", self.nodes_scanned, self.knobs_scanned, self.keys_found)
+        if self._slowest_nodes:
+            line += " | slowest: " + ", ".join("{0} {1:.1f} ms".format(node_name, seconds * 1000.0)
+                                               for node_name, seconds in self.slowest_nodes)
+        return line
+
+    def as_dict(self):
+        """
+        Return:
+            dict: every counter and timing of the scan, durations in seconds
+        """
+        return {"phases": dict(self.phase_times), "nodes_scanned": self.nodes_scanned,
+                "nodes_reused": self.nodes_reused, "slow_path_nodes": list(self.slow_path_nodes),
+                "knobs_scanned": self.knobs_scanned, "keys_found": self.keys_found,
+                "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+                "slowest_nodes": self.slowest_nodes}
@@ -0,0 +1,212 @@
+"""
+Persistent keyframe index, saved per script as a compact binary sidecar file which is read through mmap.
+Nothing in here touches Nuke, so sidecars can be inspected headless.
+
+Layout, all little-endian and fixed width except for the two blobs at the end:
+    header:      magic, version, key typecode, key item size, node count, node name blob size,
+                 merged key count, scan settings checksum
+    node table:  per node: content fingerprint, name offset, name length, key offset, key count
+    merged keys: the keys the gaps were last shown for
+    node keys:   every node's keys, back to back
+    names:       utf-8 node names, back to back
+"""
+import hashlib
+import io
+import mmap
+import os
+import struct
+import zlib
+from array import array
+
+from gapframes import gaps
+
+MAGIC = b"GFKS"
+VERSION = 1
+HEADER = struct.Struct("<4sHcBIIQI")
+NODE_RECORD = struct.Struct("<IIIQQ")
+SIDECAR_EXTENSION = ".gfk"
+
+
+def _array_bytes(keys):
+    # Python 2 arrays only have tostring/fromstring.
+    return (getattr(keys, "tobytes", None) or keys.tostring)()
+
+def _extend_array_from_bytes(keys, data):
+    (getattr(keys, "frombytes", None) or keys.fromstring)(data)
+
+def sidecar_path(script_path, cache_dir):
+    """
+    Args:
+        script_path (str): path of the Nuke script the sidecar belongs to
+        cache_dir (str): directory all sidecars are stored in
+
+    Return:
+        str: path of the script's sidecar file
+    """
+    script_key = hashlib.sha1(os.path.abspath(script_path).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(cache_dir, script_key + SIDECAR_EXTENSION)
+
+def settings_checksum(allow_knobs=None, exclude_knobs=None):
+    """
+    Return:
+        int: checksum of the knob filters node keys were scanned with, keys scanned with other filters can't be reused
+    """
+    settings = repr((sorted(allow_knobs or []), sorted(exclude_knobs or [])))
+    return zlib.crc32(settings.encode("utf-8")) & 0xffffffff
+
+def write_sidecar(path, node_records, merged_keys, checksum=0):
+    """
+    Save node keys and merged keys as a sidecar, replacing any previous one atomically.
+
+    Args:
+        path (str): path of the sidecar file
+        node_records (dict): {node name: (content fingerprint, array.array of keys)}
+        merged_keys (array.array): merged keys of the last scan
+        checksum (int, optional): settings_checksum of the scan settings
+    """
+    typecode = "d" if merged_keys.typecode == "d" or any(
+        keys.typecode == "d" for _, keys in node_records.values()) else "l"
+    itemsize = array(typecode).itemsize
+
+    names = sorted(node_records)
+    encoded_names = [name.encode("utf-8") for name in names]
+    name_blob_size = sum(len(name) for name in encoded_names)
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    temp_path = path + ".tmp"
+    try:
+        with io.open(temp_path, "wb") as sidecar:
+            sidecar.write(HEADER.pack(MAGIC, VERSION, typecode.encode("ascii"), itemsize, len(names),
+                                      name_blob_size, len(merged_keys), checksum))
+            name_offset = 0
+            key_offset = 0
+            for name, encoded_name in zip(names, encoded_names):
+                fingerprint, keys = node_records[name]
+                sidecar.write(NODE_RECORD.pack(fingerprint, name_offset, len(encoded_name), key_offset, len(keys)))
+                name_offset += len(encoded_name)
+                key_offset += len(keys)
+
+            sidecar.write(_array_bytes(array(typecode, merged_keys)))
+            for name in names:
+                sidecar.write(_array_bytes(array(typecode, node_records[name][1])))
+            for encoded_name in encoded_names:
+                sidecar.write(encoded_name)
+    except Exception:
+        # Never leave a half written sidecar behind.
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if os.path.exists(path):
+        os.remove(path)  # os.rename can't replace files on Windows.
+    os.rename(temp_path, path)
+
+
+class Sidecar(object):
+    """
+    Memory mapped, read-only view of a sidecar file. Keys are only copied out of the file when asked for.
+    """
+
+    def __init__(self, path, checksum=0):
+        """
+        Args:
+            path (str): path of the sidecar file
+            checksum (int, optional): settings_checksum of the current scan settings
+
+        Raises:
+            IOError/OSError: if the file can't be read
+            ValueError: if the file isn't a sidecar this version can read
+        """
+        self.path = path
+        self._file = io.open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Empty sidecar file.")
+
+        try:
+            self._read_index(checksum)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_index(self, checksum):
+        if len(self._data) < HEADER.size:
+            raise ValueError("Truncated sidecar file.")
+        (magic, version, typecode, itemsize, node_count, name_blob_size,
+         merged_count, file_checksum) = HEADER.unpack_from(self._data, 0)
+        self.typecode = typecode.decode("ascii")
+        if magic != MAGIC or version != VERSION or array(self.typecode).itemsize != itemsize:
+            raise ValueError("Unsupported sidecar file.")
+        self.settings_match = file_checksum == checksum
+
+        self._itemsize = itemsize
+        self._merged_offset = HEADER.size + (node_count * NODE_RECORD.size)
+        self._merged_count = merged_count
+        self._node_keys_offset = self._merged_offset + (merged_count * itemsize)
+
+        records = [NODE_RECORD.unpack_from(self._data, HEADER.size + (ind * NODE_RECORD.size))
+                   for ind in range(node_count)]
+        total_node_keys = sum(record[4] for record in records)
+        names_offset = self._node_keys_offset + (total_node_keys * itemsize)
+        if len(self._data) != names_offset + name_blob_size:
+            raise ValueError("Truncated sidecar file.")
+
+        # {node name: (fingerprint, key offset, key count)}
+        self._records = {}
+        for fingerprint, name_offset, name_length, key_offset, key_count in records:
+            start = names_offset + name_offset
+            name = self._data[start:start + name_length].decode("utf-8")
+            self._records[name] = (fingerprint, key_offset, key_count)
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def _read_keys(self, offset, count):
+        keys = array(self.typecode)
+        _extend_array_from_bytes(keys, self._data[offset:offset + (count * self._itemsize)])
+        return keys
+
+    def merged_keys(self):
+        """
+        Return:
+            array.array: merged keys of the scan the sidecar was written for
+        """
+        return self._read_keys(self._merged_offset, self._merged_count)
+
+    def node_names(self):
+        return list(self._records)
+
+    def node_record(self, name):
+        """
+        Return:
+            tuple: (content fingerprint, array.array of keys) stored for a node, or None if it isn't stored
+        """
+        record = self._records.get(name)
+        if record is None:
+            return None
+        fingerprint, key_offset, key_count = record
+        return fingerprint, self._read_keys(self._node_keys_offset + (key_offset * self._itemsize), key_count)
+
+    def node_keys(self, name, fingerprint):
+        """
+        Return:
+            array.array: stored keys of a node, only if they were scanned with the current scan settings
+                         and the node's content fingerprint is unchanged, None otherwise
+        """
+        record = self._records.get(name)
+        if not self.settings_match or record is None or record[0] != fingerprint:
+            return None
+        return self.node_record(name)[1]
+
+    def gap_arrays(self):
+        """
+        Return:
+            GapArrays: the gaps between the stored merged keys
+        """
+        return gaps.compute_gaps(self.merged_keys())
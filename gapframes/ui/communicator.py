@@ -15,6 +15,7 @@ class Communicator(QtCore.QObject):
     cycle_prev = QtCore.Signal()
     cycle_gap_distance = QtCore.Signal()
     relay_message = QtCore.Signal(str, dict)
+    scan_timings = QtCore.Signal(dict)
 
     def show_gapframes_panel(self):
         self.fetch_panel.emit()
@@ -40,6 +41,9 @@ class Communicator(QtCore.QObject):
         self.report_message(msg, in_shell=in_shell, in_nuke=in_nuke)
         raise error_type(msg)
 
+    def emit_scan_timings(self, timings):
+        self.scan_timings.emit(timings)
+
     def emit_print_ui_items(self):
         self.print_ui_items.emit()
 
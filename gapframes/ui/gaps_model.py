@@ -0,0 +1,77 @@
+"""
+Qt item model exposing a GapsContainer to the panel's Gaps List view.
+Rows are formatted on demand, so only the rows that are actually painted cost anything.
+"""
+from PySide2 import QtCore
+
+from gapframes.gaps_container import GapsContainer
+
+
+class GapsListModel(QtCore.QAbstractListModel):
+    """
+    Read-only list model over a GapsContainer, presenting its rows in the container's current sort order.
+    """
+
+    def __init__(self, container=None, parent=None):
+        super(GapsListModel, self).__init__(parent)
+        self._container = container if container is not None else GapsContainer()
+        # Called with a GapRow to get its tooltip, e.g. the nodes and knobs holding its keys.
+        self._tooltip_func = None
+
+    @property
+    def container(self):
+        """
+        GapsContainer: the gaps currently presented by the model
+        """
+        return self._container
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._container)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self._container[index.row()].get("repr")
+        if role == QtCore.Qt.ToolTipRole and self._tooltip_func is not None:
+            return self._tooltip_func(self._container[index.row()])
+        return None
+
+    def set_tooltip_func(self, tooltip_func):
+        """
+        Args:
+            tooltip_func (func): called with a row's GapRow, returns the row's tooltip text, None for no tooltips
+        """
+        self._tooltip_func = tooltip_func
+
+    def set_container(self, container):
+        """
+        Swap the presented gaps for a new container, resetting any attached views.
+
+        Args:
+            container (GapsContainer): the new gaps to present
+        """
+        self.beginResetModel()
+        self._container = container
+        self.endResetModel()
+
+    def apply_sort(self, sorting_func):
+        """
+        Re-order the presented rows with a layout change, keeping attached views' current rows on their gaps.
+
+        Args:
+            sorting_func (func): one of the container's sort_* methods
+        """
+        self.layoutAboutToBeChanged.emit()
+
+        container = self._container
+        old_indexes = self.persistentIndexList()
+        storage_indexes = [container.storage_index(ind.row()) for ind in old_indexes]
+        sorting_func()
+        new_indexes = [self.index(container.row_for_storage_index(storage_ind))
+                       for storage_ind in storage_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+
+        self.layoutChanged.emit()
@@ -0,0 +1,64 @@
+"""
+Registers the Gapframes commands in Nuke's Viewer menu, with their hotkeys.
+Hotkeys are read from the saved preferences, so they work before the panel is ever built.
+"""
+from functools import partial
+
+import nuke
+
+from gapframes.constants import BUTTON_ORDER, HOTKEYS
+from gapframes.ui.preferences import PanelPreferences
+
+MENU_NAME_PREFIX = "Gapframes: "
+# Hotkeys last registered - {button_name: hotkey}
+_registered_hotkeys = {}
+
+
+def _run_action(func_name):
+    # Imported when a command runs, gapframes.main is what builds the panel.
+    from gapframes import main
+    getattr(main, func_name)()
+
+def saved_hotkeys(preferences=None):
+    """
+    Args:
+        preferences (PanelPreferences, optional): the Gapframes preferences, read from file if not given
+
+    Return:
+        dict: {button_name: hotkey}, defaults for hotkeys which were never changed
+    """
+    if preferences is None:
+        preferences = PanelPreferences()
+    return dict((button_name, preferences.value(settings["ui_elem"]))
+                for button_name, settings in HOTKEYS.items())
+
+def register_hotkeys(hotkeys):
+    """
+    Add the Gapframes commands to the Viewer menu, or update the hotkeys of ones already added.
+
+    Args:
+        hotkeys (dict): {button_name: hotkey}, buttons missing from it are left as they are
+
+    Return:
+        dict: {button_name: hotkey} of every registered command
+    """
+    menu = nuke.toolbar("Nuke").menu("Viewer")
+    if not _registered_hotkeys:
+        menu.addSeparator()
+
+    for button_name in BUTTON_ORDER:
+        settings = HOTKEYS.get(button_name)
+        hotkey = hotkeys.get(button_name)
+        if not settings or hotkey is None or hotkey == _registered_hotkeys.get(button_name):
+            # If hotkey is the same, do nothing.
+            continue
+
+        menu_button_name = MENU_NAME_PREFIX + button_name
+        menu_item = menu.findItem(menu_button_name)
+        if menu_item:
+            menu_item.setShortcut(hotkey)
+        else:
+            menu.addCommand(menu_button_name, partial(_run_action, settings["func"]), hotkey, shortcutContext=1)
+
+        _registered_hotkeys[button_name] = hotkey
+    return dict(_registered_hotkeys)
@@ -0,0 +1,173 @@
+"""
+Cycles through keyframe gaps from the hotkeys, straight on the gap data, without going through the panel.
+A burst of repeated presses moves a cursor over the gaps, and the playhead only jumps once the burst settles,
+so holding a hotkey doesn't make the Viewer render every gapframe on the way.
+"""
+import os
+from timeit import default_timer
+
+import nuke
+from PySide2 import QtCore
+
+from gapframes import gap_queries, gaps, sidecar
+from gapframes.constants import (DEFAULT_GAP_DISTANCE, NAVIGATOR_COALESCE_MS, NAVIGATOR_MAX_WAIT_MS,
+                                 SIDECAR_DIR)
+from gapframes.gaps_container import GapCursor, GapsContainer
+from gapframes.ui.preferences import PanelPreferences
+
+
+def _knob_names(text):
+    # Same clean up as the panel does to its knob fields, minus the error reporting.
+    return text.replace(" ", "").split(",") if text else None
+
+def load_script_gaps(script_path, preferences=None):
+    """
+    Build the gaps of a script from its sidecar, with the panel's saved knob filters, Key Tolerance,
+    Collapse Dense Keys, Min Gap Length and Top Gaps preferences, without building the panel.
+
+    Args:
+        script_path (str): path of the script
+        preferences (PanelPreferences, optional): the Gapframes preferences, read from file if not given
+
+    Return:
+        GapsContainer: the script's gaps, chronologically, empty if it has no usable sidecar
+    """
+    sidecar_path = sidecar.sidecar_path(script_path, SIDECAR_DIR)
+    if not os.path.isfile(sidecar_path):
+        return GapsContainer()
+
+    if preferences is None:
+        preferences = PanelPreferences()
+    knob_filters = gaps.compile_knob_filters(_knob_names(preferences.value("knobSection_allowedKnobs_lineEdit")),
+                                             _knob_names(preferences.value("knobSection_excludedKnobs_lineEdit")))
+    try:
+        script_sidecar = sidecar.Sidecar(sidecar_path, sidecar.settings_checksum(*knob_filters))
+    except (IOError, OSError, ValueError):
+        return GapsContainer()
+    try:
+        if not script_sidecar.settings_match:
+            return GapsContainer()
+        keys = script_sidecar.merged_keys()
+    finally:
+        script_sidecar.close()
+
+    keys = gaps.merge_close_keys(keys, preferences.value("extraOptions_keyTolerance_doubleSpinBox") or 0)
+    if preferences.value("extraOptions_collapseDense_checkBox"):
+        gap_arrays, dense_segments = gaps.split_dense_segments(keys)
+    else:
+        gap_arrays, dense_segments = gaps.compute_gaps(keys), None
+    gap_arrays = gap_queries.select_gap_arrays(gap_arrays, preferences.value("extraOptions_topGaps_spinBox") or 0,
+                                               preferences.value("extraOptions_minGapLength_doubleSpinBox") or 0)
+    return GapsContainer.from_gap_arrays(gap_arrays, dense_segments=dense_segments)
+
+
+class GapNavigator(QtCore.QObject):
+    """
+    Cycles a GapCursor through the gaps and moves the playhead to the current gapframe, coalescing bursts of
+    cycling into a single jump. The panel hands over its gaps when it has some, otherwise they're read from
+    the current script's sidecar.
+    """
+    settled = QtCore.Signal(int)  # Row the playhead was moved to, once a burst of cycling settled.
+
+    def __init__(self, coalesce_ms=NAVIGATOR_COALESCE_MS, max_wait_ms=NAVIGATOR_MAX_WAIT_MS, parent=None):
+        """
+        Args:
+            coalesce_ms (int, optional): presses closer together than this many milliseconds form a burst
+            max_wait_ms (int, optional): longest a burst delays moving the playhead for
+        """
+        super(GapNavigator, self).__init__(parent)
+        self.cursor = GapCursor()
+        self.gap_distance = DEFAULT_GAP_DISTANCE
+        self.max_wait_ms = max_wait_ms
+        # Script the gaps were read from the sidecar of, None if they were handed over by the panel.
+        self._script_path = None
+        self._target_frame = None
+        self._burst_start = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(coalesce_ms)
+        self._timer.timeout.connect(self._jump)
+
+    def set_container(self, container, row=None):
+        """
+        Cycle through the given gaps from now on, e.g. the panel's latest ones.
+
+        Args:
+            container (GapsContainer): the gaps, None to read them from the sidecar again on next use
+            row (int, optional): row of the container's current sort order to start on
+        """
+        self.cursor.set_container(container, row)
+        self._script_path = None
+
+    def set_current_row(self, row):
+        """
+        Continue cycling from a row, e.g. the one picked in the panel's Gaps List.
+        """
+        self.cursor.row = row if row is not None and row >= 0 else None
+
+    def _load_script_gaps(self):
+        script_path = nuke.root().name()
+        if not script_path or script_path == "Root":
+            # The script was never saved, so it can't have a sidecar.
+            return
+        self.cursor.set_container(load_script_gaps(script_path))
+        self._script_path = script_path
+
+    def _ensure_gaps(self):
+        if self._script_path is not None and self._script_path != nuke.root().name():
+            # Another script was opened since the sidecar was read.
+            self.cursor.set_container(None)
+            self._script_path = None
+        if not len(self.cursor.container):
+            self._load_script_gaps()
+
+    def cycle(self, step):
+        """
+        Move to the next or previous gap. The playhead follows once no other press came in for a moment.
+
+        Args:
+            step (int): 1 to cycle to the next gap, -1 to cycle to the previous one
+        """
+        in_burst = self._timer.isActive()
+        if not in_burst:
+            self._ensure_gaps()
+        cursor = self.cursor
+        if not len(cursor.container):
+            return
+
+        if in_burst:
+            # The playhead hasn't moved since the burst began, carry on from the cursor.
+            cursor.cycle(step, distance=self.gap_distance)
+        else:
+            # First press of a burst, the only one reading the playhead: if it was moved off the current
+            # gapframe, chronological cycling continues from where it is.
+            frame = nuke.frame()
+            parked = frame == cursor.gapframe(self.gap_distance)
+            cursor.cycle(step, None if parked else frame, self.gap_distance)
+            self._burst_start = default_timer()
+        self._target_frame = cursor.gapframe(self.gap_distance)
+
+        # Each press pushes the jump back, up to the longest wait of a burst.
+        if not in_burst or (default_timer() - self._burst_start) * 1000 < self.max_wait_ms:
+            self._timer.start()
+
+    def flush(self):
+        """
+        Move the playhead right away if a burst of cycling is pending.
+        """
+        if self._timer.isActive():
+            self._timer.stop()
+            self._jump()
+
+    def _jump(self):
+        if self._target_frame is None:
+            return
+        nuke.frame(self._target_frame)
+        self._target_frame = None
+        row = self.cursor.row
+        if row is not None:
+            self.settled.emit(row)
+
+
+NAVIGATOR = GapNavigator()
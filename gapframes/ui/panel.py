@@ -1,19 +1,26 @@
-import inspect
+import cProfile
 import os
 import traceback
 from datetime import datetime
-from operator import itemgetter
 
 import nuke
-from PySide2 import QtCore, QtGui, QtUiTools, QtWidgets
+from PySide2 import QtCore, QtGui, QtWidgets
 
 # Gapframes imports
 import gapframes.ui.panel_utils as pu
-from gapframes import utils
-from gapframes.constants import (BUTTON_ORDER, HOTKEYS, PANEL_UI_PATH, PREFERENCES_PATH, PREFERENCES_TARGETS,
-                                 NODE_SELECTION_RADIO_BUTTONS, HOTKEY_UI_ITEMS, PANEL_OBJECT_NAME)
+from gapframes import gap_queries, gaps, sidecar, utils
+from gapframes.constants import (HOTKEYS, PANEL_UI_PATH, PREFERENCES_PATH,
+                                 NODE_SELECTION_RADIO_BUTTONS, HOTKEY_UI_ITEMS, PANEL_OBJECT_NAME, PROFILE_STATS_DIR,
+                                 SIDECAR_DIR, PLAYHEAD_POLL_MS)
 from gapframes.gaps_container import GapsContainer
+from gapframes.key_sources import KeySources, gaps_bounded_by
+from gapframes.scan_stats import PHASE_GAPS, PHASE_RESOLVE, PHASE_VIEW, ScanStats
 from gapframes.ui.communicator import COMMUNICATOR
+from gapframes.ui import hotkeys, ui_loader
+from gapframes.ui.preferences import PanelPreferences
+from gapframes.ui.gaps_model import GapsListModel
+from gapframes.ui.navigator import NAVIGATOR
+from gapframes.ui.scanner import GapScanner
 
 
 class GapframesPanel(QtWidgets.QMainWindow):
@@ -27,8 +34,24 @@ class GapframesPanel(QtWidgets.QMainWindow):
         self.resize(540, 655)
 
         self._gaps_container = GapsContainer()
-        self.preferences = QtCore.QSettings(PREFERENCES_PATH, QtCore.QSettings.IniFormat)
-        self.preferences.setFallbacksEnabled(False)
+        self._gaps_model = GapsListModel(self._gaps_container)
+        self._scanner = GapScanner(parent=self)
+        self._scan_stats = ScanStats()
+        self._sidecar = None
+        self._node_records = {}
+        # Unbounded keys of every scanned knob - {(node name, knob name): keys}, to tell which nodes and
+        # knobs bound each gap. The tagged merge is only built once a tooltip asks for it.
+        self._knob_records = {}
+        self._key_sources = None
+        # Merged keys of the last scan over the full frame range, before the Scan Boundary cuts them,
+        # Key Tolerance is applied and dense runs are collapsed, so those settings can be changed without rescanning.
+        self._scan_keys = None
+        # Frame the Scan Boundary window is centred on, followed to the playhead while the panel is shown.
+        self._boundary_frame = None
+        self._playhead_timer = QtCore.QTimer(self)
+        self._playhead_timer.setInterval(PLAYHEAD_POLL_MS)
+        self._profiler = None
+        self.preferences = PanelPreferences(PREFERENCES_PATH)
         # Save a reference of which hotkeys were last set - {menu_button_name: hotkey}
         self.hotkeys = {}
         self._init_ui()
@@ -41,7 +64,9 @@ class GapframesPanel(QtWidgets.QMainWindow):
             msg = "UI file necessary for Gapframes was not found. Is the tool installed correctly?"
             COMMUNICATOR.report_message_with_error(msg, error_type=OSError)
 
-        self.ui = QtUiTools.QUiLoader().load(PANEL_UI_PATH)
+        self.ui = ui_loader.load_panel_ui(PANEL_UI_PATH)
+        self.ui.gapsList_list_listView.setModel(self._gaps_model)
+        self._gaps_model.set_tooltip_func(self._gap_sources_tooltip)
         self.ui.node_selection_button_group = QtWidgets.QButtonGroup()
         for button_name in NODE_SELECTION_RADIO_BUTTONS:
             button = getattr(self.ui, button_name)
@@ -53,11 +78,14 @@ class GapframesPanel(QtWidgets.QMainWindow):
         self.setMaximumSize(self.ui.maximumSize())
         self.setMinimumSize(self.ui.minimumSize())
 
+        self._set_scan_widgets_visible(False)
         self._toggle_window_stays_on_top(force_state=True, force_show=False)
         self._setup_input_sanitization()
         self._pass_signal_connections()
         self.restore_preferences()
+        self.ui.gapsList_stats_label.setVisible(self.ui.extraOptions_showScanStats_checkBox.isChecked())
         self._add_hotkeys()
+        self._restore_gaps_from_sidecar()
 
     def _toggle_window_stays_on_top(self, force_state=None, force_show=True):
         """
@@ -83,32 +111,14 @@ class GapframesPanel(QtWidgets.QMainWindow):
             self.show()
 
     def _add_hotkeys(self):
-        menu = nuke.toolbar("Nuke").menu("Viewer")
-        menu.addSeparator()
-
-        for button_name in BUTTON_ORDER:
-            settings = HOTKEYS.get(button_name)
-            if not settings:
-                continue
-
-            fallback_msg = "nuke.message('Failed to find func to use for button \"{0}\".'".format(button_name)
-            func = getattr(COMMUNICATOR, settings.get("func", fallback_msg))
+        """
+        Register the hotkeys currently typed into the Hotkeys fields.
+        """
+        typed_hotkeys = {}
+        for button_name, settings in HOTKEYS.items():
             ui_elem = getattr(self.ui, settings.get("ui_elem", ""))
-
-            hotkey = ui_elem.text()
-            if hotkey == self.hotkeys.get(button_name):
-                # If hotkey is the same, do nothing.
-                continue
-
-            menu_button_name = "Gapframes: " + button_name
-            menu_item = menu.findItem(menu_button_name)
-            if menu_item:
-                menu_item.setShortcut(hotkey)
-            else:
-                menu.addCommand(menu_button_name, func, hotkey, shortcutContext=1)
-
-            self.hotkeys[button_name] = hotkey
-            ui_elem.setText(hotkey)
+            typed_hotkeys[button_name] = ui_elem.text()
+        self.hotkeys = hotkeys.register_hotkeys(typed_hotkeys)
 
     def _setup_input_sanitization(self):
         node_knob_input_objects = (
@@ -145,9 +155,11 @@ class GapframesPanel(QtWidgets.QMainWindow):
         ui = self.ui
         ui.bottom_closeWin_pushButton.clicked.connect(self.hide)
         ui.gapsList_update_pushButton.clicked.connect(self.repopulate_gaps_list)
+        ui.gapsList_cancel_pushButton.clicked.connect(self._scanner.cancel)
         ui.gapsList_cycleNext_pushButton.clicked.connect(self.cycle_next_item)
         ui.gapsList_cyclePrev_pushButton.clicked.connect(self.cycle_previous_item)
         ui.bottom_jumpAction_pushButton.clicked.connect(self.jump_to_gapframe)
+        ui.bottom_copyGapframeRanges_pushButton.clicked.connect(self.copy_gapframe_ranges)
         ui.nodeSection_specificNodes_radioButton.toggled.connect(
             lambda state: self.enable_node_names_field(state)
         )
@@ -155,14 +167,31 @@ class GapframesPanel(QtWidgets.QMainWindow):
         for obj in (ui.extraOptions_gapDistance_spinBox, ui.extraOptions_gapDistance_slider):
             obj.valueChanged.connect(lambda val: self._gap_distance_updater(val))
 
+        ui.extraOptions_showScanStats_checkBox.toggled.connect(ui.gapsList_stats_label.setVisible)
+        ui.extraOptions_scanBoundary_spinBox.valueChanged.connect(self._rebuild_from_scan_keys)
+        ui.extraOptions_keyTolerance_doubleSpinBox.valueChanged.connect(self._rebuild_from_scan_keys)
+        ui.extraOptions_collapseDense_checkBox.toggled.connect(self._rebuild_from_scan_keys)
+        ui.extraOptions_minGapLength_doubleSpinBox.valueChanged.connect(self._rebuild_from_scan_keys)
+        ui.extraOptions_topGaps_spinBox.valueChanged.connect(self._rebuild_from_scan_keys)
+        ui.gapsList_nodeFilter_comboBox.currentIndexChanged.connect(self._rebuild_from_scan_keys)
         ui.gapsList_sorting_comboBox.currentIndexChanged.connect(self.sorting_handler)
-        ui.gapsList_list_listWidget.currentRowChanged.connect(self.update_cur_gapframe)
-        ui.gapsList_list_listWidget.itemDoubleClicked.connect(self.jump_to_gapframe)
+        ui.gapsList_list_listView.selectionModel().currentRowChanged.connect(self._on_current_row_changed)
+        ui.gapsList_list_listView.doubleClicked.connect(self.jump_to_gapframe)
 
         for item in HOTKEY_UI_ITEMS:
             ui_elem = getattr(self.ui, item)
             ui_elem.editingFinished.connect(self._add_hotkeys)
 
+        NAVIGATOR.settled.connect(self._on_navigator_settled)
+        self._playhead_timer.timeout.connect(self._follow_playhead)
+
+        scanner = self._scanner
+        scanner.progress.connect(self._on_scan_progress)
+        scanner.keys_updated.connect(self._on_scan_keys_updated)
+        scanner.finished.connect(self._on_scan_finished)
+        scanner.cancelled.connect(self._on_scan_cancelled)
+        scanner.failed.connect(self._on_scan_failed)
+
     def _gap_distance_updater(self, value):
         """
         Handle changes to UI elements related to Gap Distance settings.
@@ -178,43 +207,43 @@ class GapframesPanel(QtWidgets.QMainWindow):
 
         num_field.setValue(value)
         slider.setValue(value)
+        NAVIGATOR.gap_distance = value
         self.update_cur_gapframe()
 
         num_field.blockSignals(False)
         slider.blockSignals(False)
 
-    def _update_gaps_listWidget(self):
+    def _current_row(self):
+        """
+        Return:
+            int: the current row of the Gaps List view, -1 if there is none
+        """
+        return self.ui.gapsList_list_listView.currentIndex().row()
+
+    def _set_current_row(self, row):
+        """
+        Make a row of the Gaps List view the current and selected one.
+        """
+        list_view = self.ui.gapsList_list_listView
+        index = self._gaps_model.index(row)
+        list_view.setCurrentIndex(index)
+        list_view.scrollTo(index)
+
+    def _update_gaps_listView(self):
         """
-        Clear the Gaps List widget and re-fill with stored gaps information.
+        Point the Gaps List view at the stored gaps information.
         """
-        list_widget = self.ui.gapsList_list_listWidget
-        list_widget.clear()
+        self._gaps_model.set_container(self._gaps_container)
+        NAVIGATOR.set_container(self._gaps_container)
+        self.ui.bottom_gapframeRanges_lineEdit.setText(
+            gaps.format_frame_ranges(self._gaps_container.gapframe_targets()))
 
         if len(self._gaps_container) <= 0:
             return
 
-        for gap in self._gaps_container:
-            item_str = gap.get("repr")
-            list_widget.addItem(item_str)
-
-        cur_frame = nuke.frame()
-        ind = 0  # Fallback default.
-        for ind, gap in enumerate(self._gaps_container):
-            gap_start = gap.get("start")
-            gap_end = gap.get("end")
-            if gap_start <= cur_frame <= gap_end:
-                # Found the gap where current Viewer frame is.
-                break
-
-        # Check if current frame is outside of known Keyframe gaps.
-        lowest_known = min(self._gaps_container, key=itemgetter("start"))
-        highest_known = max(self._gaps_container, key=itemgetter("end"))
-        if cur_frame <= lowest_known.get("start"):
-            ind = self._gaps_container.index(lowest_known)
-        elif cur_frame >= highest_known.get("end"):
-            ind = self._gaps_container.index(highest_known)
-
-        list_widget.setCurrentRow(ind)
+        # Select the gap where current Viewer frame is, or the nearest known one if outside of all gaps.
+        ind = self._gaps_container.row_for_frame(nuke.frame())
+        self._set_current_row(ind)
 
     def _cycle_gap_distance_value(self):
         """
@@ -245,6 +274,14 @@ class GapframesPanel(QtWidgets.QMainWindow):
         self.save_all_preferences()
         super(GapframesPanel, self).closeEvent(event)
 
+    def showEvent(self, event):
+        super(GapframesPanel, self).showEvent(event)
+        self._playhead_timer.start()
+
+    def hideEvent(self, event):
+        self._playhead_timer.stop()
+        super(GapframesPanel, self).hideEvent(event)
+
     def connect_communicator(self, comm):
         """
         Connect external signalling for communication with the Panel.
@@ -283,26 +320,330 @@ class GapframesPanel(QtWidgets.QMainWindow):
         """
         Args:
             update_container (bool, optional): whether to update the internal container with info
-                                               about the currently known keyframe gaps
+                                               about the currently known keyframe gaps, this starts
+                                               a time-sliced scan which fills in the list as it goes
             do_sort (bool, optional): whether to update the sorting of the items in the internal container
         """
+        if update_container:
+            # The scan runs in time slices on the event loop, results arrive through the scanner's signals.
+            self.start_gaps_scan()
+            return
+
+        if do_sort:
+            self._sort_container()
+
+        self._update_gaps_listView()
+
+    def start_gaps_scan(self):
+        """
+        Start scanning for keyframe gaps in time slices, restarting any scan that is still running.
+        The Gaps List fills in as nodes get scanned.
+        """
+        if self.ui.extraOptions_profileNextScan_checkBox.isChecked():
+            self._start_profiling()
+
+        self._scan_stats = ScanStats()
         try:
-            if update_container:
-                nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out = pu.get_scan_parameters(self.ui)
-                all_gaps = utils.find_all_gaps(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out)
-                self._gaps_container = GapsContainer(all_gaps)  # Replace container.
+            with self._scan_stats.phase(PHASE_RESOLVE):
+                nodes, allow_knobs, exclude_knobs, _, _ = pu.get_scan_parameters(self.ui)
         except Exception:
             # If any error, clear the Gaps List.
-            self._gaps_container = GapsContainer()
-            self._update_gaps_listWidget()
+            self._scanner.cancel()
+            self._stop_profiling(save=False)
+            self._clear_gaps_list()
             raise
 
-        if do_sort:
-            self.sorting_handler()
+        self._node_records = {}
+        self._set_knob_records({})
+        self._open_sidecar()
+        # Fingerprinting serializes every node, only worth it if the scan can be saved as a sidecar.
+        node_records = self._node_records if self._get_sidecar_path() else None
+        # The full frame range gets scanned, the Scan Boundary only cuts the keys being shown.
+        self._boundary_frame = nuke.frame()
+        work_units = utils.iter_node_keys(nodes, allow_knobs, exclude_knobs, scan_stats=self._scan_stats,
+                                          sidecar=self._sidecar, node_records=node_records,
+                                          knob_records=self._knob_records)
+        focus_frame = nuke.frame() if self.ui.extraOptions_progressiveScan_checkBox.isChecked() else None
+        self._set_scan_widgets_visible(True)
+        self._scanner.start(work_units, len(nodes), focus_frame, self._scan_stats)
+
+    def _get_sidecar_path(self):
+        """
+        Return:
+            str: path of the current script's keyframe index sidecar, None if the script was never saved
+        """
+        script_path = nuke.root().name()
+        if not script_path or script_path == "Root":
+            return None
+        return sidecar.sidecar_path(script_path, SIDECAR_DIR)
+
+    def _open_sidecar(self):
+        """
+        Open the current script's sidecar, if there is a readable one.
+        """
+        self._close_sidecar()
+        sidecar_path = self._get_sidecar_path()
+        if not sidecar_path or not os.path.isfile(sidecar_path):
+            return
+
+        checksum = sidecar.settings_checksum(*pu.get_knob_filters(self.ui))
+        try:
+            self._sidecar = sidecar.Sidecar(sidecar_path, checksum)
+        except (IOError, OSError, ValueError):
+            self.report_message("Ignoring unreadable sidecar: {0}".format(sidecar_path), in_nuke=False)
 
-        self._update_gaps_listWidget()
+    def _close_sidecar(self):
+        if self._sidecar is not None:
+            self._sidecar.close()
+            self._sidecar = None
 
-    def sorting_handler(self):
+    def _restore_gaps_from_sidecar(self):
+        """
+        Show the gaps saved for the current script by an earlier session, without scanning.
+        """
+        try:
+            self._open_sidecar()
+        except Exception:
+            # A panel should still open if the knob filter preferences are broken.
+            return
+        if self._sidecar is None or not self._sidecar.settings_match:
+            return
+
+        keys = self._sidecar.merged_keys()
+        if len(keys) >= 2:
+            # The sidecar only knows the keys of whole nodes, not of their knobs.
+            self._set_knob_records(dict(((node_name, None), self._sidecar.node_record(node_name)[1])
+                                        for node_name in self._sidecar.node_names()))
+            self._update_node_filter_items()
+            self._boundary_frame = nuke.frame()
+            self._on_scan_keys_updated(keys)
+
+    def _save_sidecar(self, keys):
+        """
+        Save the keys of the finished scan as the current script's sidecar. Nodes which weren't part of
+        this scan keep the keys saved for them earlier.
+
+        Args:
+            keys (array.array): merged keys of the finished scan
+        """
+        sidecar_path = self._get_sidecar_path()
+        if not sidecar_path:
+            return
+
+        node_records = {}
+        old_sidecar = self._sidecar
+        if old_sidecar is not None and old_sidecar.settings_match:
+            for node_name in old_sidecar.node_names():
+                node_records[node_name] = old_sidecar.node_record(node_name)
+        node_records.update(self._node_records)
+        # The file gets replaced, it can't stay mapped.
+        self._close_sidecar()
+
+        checksum = sidecar.settings_checksum(*pu.get_knob_filters(self.ui))
+        try:
+            sidecar.write_sidecar(sidecar_path, node_records, keys, checksum)
+        except Exception:
+            # The sidecar is only a cache, failing to save it mustn't cut the end of the scan short.
+            self.report_message("Failed to save sidecar: {0}\n{1}".format(sidecar_path, traceback.format_exc()),
+                                in_nuke=False)
+
+    def _start_profiling(self):
+        """
+        Profile everything that runs until the current Gaps List update ends.
+        """
+        self._stop_profiling(save=False)
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def _stop_profiling(self, save=True):
+        """
+        Stop profiling, if profiling, and optionally save the profile as a .pstats file.
+        Profiling is opt-in per update, so this also unchecks "Profile Next Update".
+        """
+        profiler = self._profiler
+        if profiler is None:
+            return
+        self._profiler = None
+        profiler.disable()
+        self.ui.extraOptions_profileNextScan_checkBox.setChecked(False)
+        if not save:
+            return
+
+        file_name = "gapframes_update_{0}.pstats".format(datetime.now().strftime("%Y%m%d_%H%M%S"))
+        stats_path = os.path.join(PROFILE_STATS_DIR, file_name)
+        try:
+            profiler.dump_stats(stats_path)
+        except (IOError, OSError):
+            self.report_message("Failed to save profile: {0}".format(stats_path), in_nuke=False)
+            return
+        self.report_message("Saved profile of the Gaps List update: {0}".format(stats_path), in_nuke=False)
+
+    def _report_scan_timings(self):
+        """
+        Publish the timings of the scan that just ended, and show them in the stats line.
+        """
+        self.ui.gapsList_stats_label.setText(self._scan_stats.timing_summary())
+        COMMUNICATOR.emit_scan_timings(self._scan_stats.as_dict())
+
+    def _set_scan_widgets_visible(self, state):
+        self.ui.gapsList_progress_progressBar.setVisible(state)
+        self.ui.gapsList_cancel_pushButton.setVisible(state)
+
+    def _clear_gaps_list(self):
+        self._scan_keys = None
+        self._set_knob_records({})
+        self._update_node_filter_items()
+        self._gaps_container = GapsContainer()
+        self._update_gaps_listView()
+
+    def _on_scan_progress(self, done, total):
+        progress_bar = self.ui.gapsList_progress_progressBar
+        progress_bar.setMaximum(total)
+        progress_bar.setValue(done)
+
+    def _windowed_keys(self, keys):
+        """
+        Return:
+            array.array: the keys within the Scan Boundary window, cut out of the sorted keys with bisect
+        """
+        return gaps.clip_keys(keys, *pu.get_scan_boundary(self.ui, self._boundary_frame))
+
+    def _on_scan_keys_updated(self, keys):
+        """
+        Show the gaps between the keys found so far.
+        """
+        if len(keys) < 2:
+            return
+        if keys is not self._scan_keys:
+            # More knobs were scanned.
+            self._key_sources = None
+        self._scan_keys = keys
+        with self._scan_stats.phase(PHASE_GAPS):
+            keys = self._windowed_keys(keys)
+            key_tolerance = self.ui.extraOptions_keyTolerance_doubleSpinBox.value()
+            keys = gaps.merge_close_keys(keys, key_tolerance)
+            if self.ui.extraOptions_collapseDense_checkBox.isChecked():
+                gap_arrays, dense_segments = gaps.split_dense_segments(keys)
+            else:
+                gap_arrays, dense_segments = gaps.compute_gaps(keys), None
+            node_keys = self._filter_node_keys()
+            if node_keys is not None:
+                gap_arrays = gaps_bounded_by(gap_arrays, node_keys, key_tolerance)
+                # Dense segments span many keys of many nodes, only gaps are filtered by node.
+                dense_segments = None
+            gap_arrays = gap_queries.select_gap_arrays(gap_arrays, self.ui.extraOptions_topGaps_spinBox.value(),
+                                                       self.ui.extraOptions_minGapLength_doubleSpinBox.value())
+            # Replace container.
+            self._gaps_container = GapsContainer.from_gap_arrays(gap_arrays, dense_segments=dense_segments)
+            self._sort_container()
+        with self._scan_stats.phase(PHASE_VIEW):
+            self._update_gaps_listView()
+
+    def _rebuild_from_scan_keys(self, *args):
+        """
+        Rebuild the Gaps List from the last scan's keys with the current Scan Boundary, Key Tolerance,
+        Collapse Dense Keys and gap filter settings, without rescanning.
+        The Scan Boundary window gets re-centred on the current frame.
+        """
+        if self._scan_keys is not None and not self._scanner.is_running():
+            self._boundary_frame = nuke.frame()
+            self._on_scan_keys_updated(self._scan_keys)
+
+    def _follow_playhead(self):
+        """
+        Re-slice the last scan's keys around the playhead once it moved, if a Scan Boundary is set.
+        """
+        if self._boundary_frame is None or not self.ui.extraOptions_scanBoundary_spinBox.value():
+            return
+        if nuke.frame() != self._boundary_frame:
+            self._rebuild_from_scan_keys()
+
+    def _on_scan_finished(self, keys):
+        self._set_scan_widgets_visible(False)
+        if len(keys) < 2:
+            self._stop_profiling()
+            self._clear_gaps_list()
+            self.report_message("Need input with 2 or more key frames.")
+            return
+
+        self._update_node_filter_items()
+        self._on_scan_keys_updated(keys)
+        self._save_sidecar(keys)
+        if len(self._windowed_keys(keys)) < 2:
+            self.report_message("Need 2 or more key frames within the Scan Boundary.", in_nuke=False)
+        self._stop_profiling()
+        self._report_scan_timings()
+        if self._scan_stats.slow_path_count:
+            self.report_message(self._scan_stats.summary(), in_nuke=False)
+
+    def _on_scan_cancelled(self, keys):
+        # Whatever was found before cancelling is already displayed.
+        self._set_scan_widgets_visible(False)
+        self._stop_profiling()
+        self._report_scan_timings()
+
+    def _on_scan_failed(self, error_msg):
+        self._set_scan_widgets_visible(False)
+        self._stop_profiling()
+        self._clear_gaps_list()
+        self.report_message(error_msg)
+
+    def _set_knob_records(self, knob_records):
+        self._knob_records = knob_records
+        self._key_sources = None
+
+    def _update_node_filter_items(self):
+        """
+        List the nodes of the last scan in the Node filter combo box, keeping the current node if still there.
+        """
+        combo_box = self.ui.gapsList_nodeFilter_comboBox
+        current_node = combo_box.currentText() if combo_box.currentIndex() > 0 else None
+        node_names = sorted(set(node_name for node_name, _ in self._knob_records))
+
+        combo_box.blockSignals(True)
+        # Index 0 is "All Nodes".
+        while combo_box.count() > 1:
+            combo_box.removeItem(1)
+        combo_box.addItems(node_names)
+        combo_box.setCurrentIndex(max(combo_box.findText(current_node), 0) if current_node else 0)
+        combo_box.blockSignals(False)
+
+    def _filter_node_keys(self):
+        """
+        Return:
+            array.array: unbounded keys of the node picked in the Node filter, None if showing all nodes
+        """
+        combo_box = self.ui.gapsList_nodeFilter_comboBox
+        if combo_box.currentIndex() <= 0:
+            return None
+        node_name = combo_box.currentText()
+        return gaps.merge_key_arrays(keys for (record_node, _), keys in self._knob_records.items()
+                                     if record_node == node_name)
+
+    def _get_key_sources(self):
+        """
+        Return:
+            KeySources: the last scan's keys tagged with their nodes and knobs, merged on first use
+        """
+        if self._key_sources is None:
+            self._key_sources = KeySources(sorted(self._knob_records.items()))
+        return self._key_sources
+
+    def _gap_sources_tooltip(self, gap_row):
+        """
+        Return:
+            str: the nodes and knobs holding the keys a gap starts and ends on
+        """
+        if not self._knob_records:
+            return None
+        return self._get_key_sources().format_gap_sources(
+            gap_row["start"], gap_row["end"], self.ui.extraOptions_keyTolerance_doubleSpinBox.value())
+
+    def _get_sorting_func(self):
+        """
+        Return:
+            func: the container sort method matching the Sort By combo box
+        """
         # Would be better if we map names of items instead of indexes.
         index_to_func_mapping = {
             0: self._gaps_container.sort_chronologically,
@@ -311,10 +652,20 @@ class GapframesPanel(QtWidgets.QMainWindow):
         }
 
         cur_index = self.ui.gapsList_sorting_comboBox.currentIndex()
-        sorting_func = index_to_func_mapping.get(cur_index, lambda: None)
-        sorting_func()  # Sort the gaps container in place.
+        return index_to_func_mapping.get(cur_index, lambda: None)
+
+    def _sort_container(self):
+        """
+        Sort the gaps container, without notifying the Gaps List view.
+        """
+        sorting_func = self._get_sorting_func()
+        sorting_func()
 
-        self.repopulate_gaps_list(update_container=False, do_sort=False)
+    def sorting_handler(self):
+        """
+        Re-order the Gaps List view in place, keeping the current gap selected.
+        """
+        self._gaps_model.apply_sort(self._get_sorting_func())
 
     def enable_node_names_field(self, state=True):
         """
@@ -327,145 +678,63 @@ class GapframesPanel(QtWidgets.QMainWindow):
         self.ui.nodeNames_input_lineEdit.setEnabled(state)
 
     def cycle_next_item(self):
-        list_widget = self.ui.gapsList_list_listWidget
-        item_count = list_widget.count()
-        next_row = list_widget.currentRow() + 1
-
-        if next_row >= item_count:
-            next_row = 0
-
-        list_widget.setCurrentRow(next_row)
-        self.jump_to_gapframe()
+        NAVIGATOR.cycle(1)
 
     def cycle_previous_item(self):
-        list_widget = self.ui.gapsList_list_listWidget
-        item_count = list_widget.count()
-        prev_row = list_widget.currentRow() - 1
+        NAVIGATOR.cycle(-1)
 
-        if prev_row < 0:
-            prev_row = item_count - 1
+    def _on_navigator_settled(self, row):
+        """
+        Select the gap the navigator moved the playhead to, once it's done cycling.
+        """
+        if row < len(self._gaps_container) and row != self._current_row():
+            self._set_current_row(row)
 
-        list_widget.setCurrentRow(prev_row)
-        self.jump_to_gapframe()
+    def _on_current_row_changed(self, current, previous):
+        NAVIGATOR.set_current_row(current.row())
+        self.update_cur_gapframe()
 
     def update_cur_gapframe(self):
         """
         Update what the UI currently considers the "Gapframe".
         """
-        list_widget = self.ui.gapsList_list_listWidget
         gapframe_field = self.ui.bottom_curGapframe_spinBox
-        cur_row = list_widget.currentRow()
+        cur_row = self._current_row()
 
         try:
-            cur_gap = self._gaps_container[cur_row]
-            gap_start = cur_gap.get("start")
-            gap_length = cur_gap.get("length")
-
             # Take % input from the "Gap Distance" field into account and find the corresponding frame
-            # in the currently selected gap entry.
+            # in the currently selected gap entry, out of the gapframes computed for every gap at once.
             gap_distance = self.ui.extraOptions_gapDistance_spinBox.value()
-            cur_gapframe = gap_start + ((gap_distance * gap_length) / 100.0)
+            cur_gapframe = self._gaps_container.gapframe(cur_row, gap_distance)
         except Exception:
             # In case of any errors with UI fields or items missing, fall back to 0.
             cur_gapframe = 0
         gapframe_field.setValue(cur_gapframe)
 
+    def copy_gapframe_ranges(self):
+        """
+        Copy the gapframes of every gap, as a frame range to render or flipbook, to the clipboard.
+        """
+        frame_ranges = self.ui.bottom_gapframeRanges_lineEdit.text()
+        QtWidgets.QApplication.clipboard().setText(frame_ranges)
+        self.report_message("Copied review frames: {0}".format(frame_ranges), in_nuke=False)
+
     def jump_to_gapframe(self):
         cur_gapframe = self.ui.bottom_curGapframe_spinBox.value()
         nuke.frame(cur_gapframe)
 
     def save_widget_preferences(self, widget):
         """
-        Save the current settings of a provided widget.
+        Save the current settings of a provided widget, if they changed.
         """
-        widget_name = widget.objectName()
-
-        if isinstance(widget, QtWidgets.QMainWindow):
-            size = widget.size()
-            widget_name = "{0}.size".format(widget_name)
-            self.preferences.setValue(widget_name, size)
-
-        if isinstance(widget, QtWidgets.QComboBox):
-            index = widget.currentIndex()
-            text = widget.itemText(index)
-            self.preferences.setValue(widget_name, text)
-
-        if isinstance(widget, QtWidgets.QLineEdit):
-            value = widget.text()
-            self.preferences.setValue(widget_name, value)
-
-        if isinstance(widget, QtWidgets.QCheckBox):
-            state = widget.isChecked()
-            self.preferences.setValue(widget_name, state)
-
-        if isinstance(widget, QtWidgets.QRadioButton):
-            # If we're saving preferences for one Radio button, update the rest too.
-            for button in self.ui.node_selection_button_group.buttons():
-                state = button.isChecked()
-                self.preferences.setValue(button.objectName(), state)
-
-        if isinstance(widget, (QtWidgets.QSlider, QtWidgets.QSpinBox)):
-            value = widget.value()
-            self.preferences.setValue(widget_name, value)
+        self.preferences.save(self, [widget.objectName()])
 
     def save_all_preferences(self):
-        for widget_name in PREFERENCES_TARGETS:
-            if widget_name == self.objectName():
-                self.save_widget_preferences(self)
-                continue
-            widget = getattr(self.ui, widget_name, None)
-            if not widget:
-                # If widget is not in loaded UI, try this class.
-                widget = getattr(self, widget_name)
-            self.save_widget_preferences(widget)
+        self.preferences.save(self)
 
     def restore_preferences(self, widget=None):
         """
         Restore the values that were last saved in the preferences file.
         If a widget is provided, only restore preferences for it, else restore for all.
         """
-        objects = inspect.getmembers(self)
-        ui_objects = inspect.getmembers(self.ui)
-        objects.extend(ui_objects)
-        objects.insert(0, (self.objectName(), self))
-
-        if widget:
-            objects = [(widget.objectName(), widget)]
-
-        for widget_name, widget in objects:
-            if widget_name not in PREFERENCES_TARGETS:
-                continue
-
-            if isinstance(widget, QtWidgets.QMainWindow):
-                widget_name = "{0}.size".format(widget_name)
-                size = self.preferences.value(widget_name)
-                if size:
-                    widget.resize(size)
-
-            if isinstance(widget, QtWidgets.QComboBox):
-                value = self.preferences.value(widget_name)
-                if not value:
-                    continue
-                index = widget.findText(value)
-                widget.setCurrentIndex(index)
-
-            if isinstance(widget, QtWidgets.QLineEdit):
-                if widget_name in HOTKEY_UI_ITEMS:
-                    widget.blockSignals(True)
-                value = self.preferences.value(widget_name)
-                if value:
-                    widget.setText(value)
-                widget.blockSignals(False)
-
-            if isinstance(widget, (QtWidgets.QCheckBox, QtWidgets.QRadioButton)):
-                value = self.preferences.value(widget_name)
-                if value in ("true", "True"):
-                    value = True
-                elif value in ("false", "False"):
-                    value = False
-                widget.setChecked(value)
-
-            if isinstance(widget, (QtWidgets.QSlider, QtWidgets.QSpinBox)):
-                value = self.preferences.value(widget_name)
-                if value:
-                    widget.setValue(int(value))
+        self.preferences.restore(self, [widget.objectName()] if widget else None)
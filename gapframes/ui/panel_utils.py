@@ -4,8 +4,10 @@ from PySide2 import QtWidgets
 
 import nuke
 
+from gapframes import gaps
 from gapframes.ui.communicator import COMMUNICATOR
 from gapframes.constants import NODE_SELECTION_RADIO_BUTTONS
+from gapframes.node_resolver import NODE_RESOLVER, unique_nodes
 
 
 def _clean_input(input_text):
@@ -44,15 +46,11 @@ def get_selected_nodes(*args):
     if not selection:
         msg = "Please select node(s)."
         COMMUNICATOR.report_message_with_error(msg, error_type=ValueError)
-    for node in selection:
-        # Recurse groups to find all child nodes.
-        if node.Class() == "Group":
-            nodes_in_group = nuke.allNodes(group=node, recurseGroups=True)
-            selection.extend(nodes_in_group)
-    return selection
+    # Recurse groups to find all child nodes.
+    return NODE_RESOLVER.expand_groups(selection)
 
 def get_nodes_in_properties_bin(*args):
-    nodes = [n for n in nuke.allNodes(recurseGroups=True) if n.shown()]
+    nodes = NODE_RESOLVER.shown_nodes()
     if not nodes:
         msg = "No nodes' Properties are currently open."
         COMMUNICATOR.report_message_with_error(msg, error_type=ValueError)
@@ -64,7 +62,7 @@ def get_specific_nodes(node_names, *args):
         node = nuke.toNode(name)
         if node:
             nodes.append(node)
-    return nodes
+    return unique_nodes(nodes)
 
 # ==============================================================================================================================
 # UI-oriented
@@ -103,6 +101,24 @@ def determine_get_nodes_func(ui):
     
     return get_nodes_func
 
+def get_knob_filters(ui):
+    """
+    Find the allowed and excluded knob names set in the UI.
+
+    Args:
+        ui (QMainWindow): loaded UI instance
+
+    Returns:
+        tuple: (list of allowed knob names, list of knob names to exclude),
+               either being None if its field is left empty
+    """
+    allow_knobs = ui.knobSection_allowedKnobs_lineEdit.text()
+    exclude_knobs = ui.knobSection_excludedKnobs_lineEdit.text()
+    # If field(s) left empty, use None.
+    allow_knobs = _clean_input(allow_knobs) if allow_knobs else None
+    exclude_knobs = _clean_input(exclude_knobs) if exclude_knobs else None
+    return gaps.compile_knob_filters(allow_knobs, exclude_knobs)
+
 def get_scan_parameters(ui):
     """
     Find various parameters in the UI related to scanning for existing Keyframes.
@@ -124,17 +140,27 @@ def get_scan_parameters(ui):
     # If specified_nodes is irrelevant to the get_nodes_func, they get ignored anyway.
     nodes = get_nodes_func(specified_nodes)
 
-    allow_knobs = ui.knobSection_allowedKnobs_lineEdit.text()
-    exclude_knobs = ui.knobSection_excludedKnobs_lineEdit.text()
-    # If field(s) left empty, use None.
-    allow_knobs = _clean_input(allow_knobs.text()) if allow_knobs else None
-    exclude_knobs = _clean_input(exclude_knobs.text()) if exclude_knobs else None
-
-    cur_frame = nuke.frame()
-    boundary_value = ui.extraOptions_scanBoundary_spinBox.value()
-    boundary_in = boundary_out = None
-    if boundary_value is not 0:
-        boundary_in = cur_frame - boundary_value
-        boundary_out = cur_frame + boundary_value
+    allow_knobs, exclude_knobs = get_knob_filters(ui)
+    boundary_in, boundary_out = get_scan_boundary(ui)
 
     return nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out
+
+def get_scan_boundary(ui, frame=None):
+    """
+    Find the frames bounding the Scan Boundary window.
+
+    Args:
+        ui (QMainWindow): loaded UI instance
+        frame (int/float, optional): frame the window is centred on, the current frame if not given
+
+    Returns:
+        tuple: (int, int) window start and end
+        or
+        tuple: (NoneType, NoneType) if UI boundary setting is 0
+    """
+    boundary_value = ui.extraOptions_scanBoundary_spinBox.value()
+    if not boundary_value:
+        return None, None
+    if frame is None:
+        frame = nuke.frame()
+    return frame - boundary_value, frame + boundary_value
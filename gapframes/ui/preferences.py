@@ -0,0 +1,191 @@
+"""
+Declarative preferences of the Gapframes panel.
+Each widget in PREFERENCES_TARGETS gets a value type, from the suffix of its name, and a default.
+Values are restored by direct lookup, and only the ones that changed get written back.
+"""
+from collections import namedtuple
+
+from PySide2 import QtCore
+
+from gapframes.constants import (HOTKEY_UI_ITEMS, PANEL_OBJECT_NAME, PREFERENCE_DEFAULTS, PREFERENCES_PATH,
+                                 PREFERENCES_TARGETS)
+
+# Value types of preferences.
+SIZE = "size"
+BOOL = "bool"
+INT = "int"
+FLOAT = "float"
+TEXT = "text"
+CHOICE = "choice"
+
+# (widget name suffix, value type) - the panel's widget names end with their widget class.
+TYPES_BY_SUFFIX = (("_radioButton", BOOL), ("_checkBox", BOOL), ("_spinBox", INT), ("_doubleSpinBox", FLOAT),
+                   ("_slider", INT), ("_lineEdit", TEXT), ("_comboBox", CHOICE))
+
+# key: name of the value in the preferences file, default: None to keep what the .ui file sets.
+PreferenceSpec = namedtuple("PreferenceSpec", ["widget_name", "value_type", "key", "default"])
+
+
+def _value_type(widget_name):
+    if widget_name == PANEL_OBJECT_NAME:
+        return SIZE
+    for suffix, value_type in TYPES_BY_SUFFIX:
+        if widget_name.endswith(suffix):
+            return value_type
+    raise ValueError("No preference type for widget: {0}".format(widget_name))
+
+def build_schema(targets=PREFERENCES_TARGETS):
+    """
+    Args:
+        targets (iterable, optional): names of the widgets to keep preferences for
+
+    Return:
+        dict: {widget name: PreferenceSpec}
+    """
+    schema = {}
+    for widget_name in targets:
+        value_type = _value_type(widget_name)
+        # The window's size is saved under its own key, as earlier versions did.
+        key = "{0}.size".format(widget_name) if value_type == SIZE else widget_name
+        schema[widget_name] = PreferenceSpec(widget_name, value_type, key, PREFERENCE_DEFAULTS.get(widget_name))
+    return schema
+
+PREFERENCES_SCHEMA = build_schema()
+
+
+def _to_type(value, value_type):
+    """
+    Convert a value read from the preferences file, INI files store most values as strings.
+    """
+    if value is None or value == "":
+        return None
+    if value_type == BOOL:
+        if isinstance(value, bool):
+            return value
+        return {"true": True, "false": False}.get(str(value).lower())
+    if value_type in (INT, FLOAT):
+        try:
+            return int(value) if value_type == INT else float(value)
+        except (TypeError, ValueError):
+            return None
+    return value
+
+
+# ============================================================================================
+# Reading and writing widget values, by value type.
+
+def _read_widget(widget, value_type):
+    if value_type == SIZE:
+        return widget.size()
+    if value_type == BOOL:
+        return widget.isChecked()
+    if value_type in (INT, FLOAT):
+        return widget.value()
+    if value_type == TEXT:
+        return widget.text()
+    return widget.itemText(widget.currentIndex())
+
+def _write_widget(widget, value_type, value):
+    if value_type == SIZE:
+        widget.resize(value)
+    elif value_type == BOOL:
+        widget.setChecked(value)
+    elif value_type in (INT, FLOAT):
+        widget.setValue(value)
+    elif value_type == TEXT:
+        widget.setText(value)
+    else:
+        index = widget.findText(value)
+        if index >= 0:
+            widget.setCurrentIndex(index)
+
+
+class PanelPreferences(object):
+    """
+    Preferences file of the Gapframes panel, remembering what it holds to only write values that changed.
+    """
+
+    def __init__(self, path=PREFERENCES_PATH, schema=None):
+        """
+        Args:
+            path (str, optional): path of the preferences INI file
+            schema (dict, optional): {widget name: PreferenceSpec}, PREFERENCES_SCHEMA if not given
+        """
+        self.schema = schema if schema is not None else PREFERENCES_SCHEMA
+        self.settings = QtCore.QSettings(path, QtCore.QSettings.IniFormat)
+        self.settings.setFallbacksEnabled(False)
+        self._stored = {}  # {widget name: value last read from or written to the file}
+
+    def value(self, widget_name):
+        """
+        Return:
+            the saved value for a widget, converted to its type, or its default if nothing valid is saved
+        """
+        spec = self.schema[widget_name]
+        if widget_name not in self._stored:
+            self._stored[widget_name] = _to_type(self.settings.value(spec.key), spec.value_type)
+        value = self._stored[widget_name]
+        return spec.default if value is None else value
+
+    @staticmethod
+    def _find_widget(panel, widget_name):
+        if widget_name == panel.objectName():
+            return panel
+        widget = getattr(panel.ui, widget_name, None)
+        if widget is None:
+            # If widget is not in loaded UI, try the panel itself.
+            widget = getattr(panel, widget_name, None)
+        return widget
+
+    def restore(self, panel, widget_names=None):
+        """
+        Set the panel's widgets to their saved values.
+
+        Args:
+            panel (GapframesPanel): the panel whose widgets to set
+            widget_names (iterable, optional): only restore these widgets, all of the schema's if not given
+        """
+        for widget_name in widget_names or self.schema:
+            value = self.value(widget_name)
+            widget = self._find_widget(panel, widget_name)
+            if value is None or widget is None:
+                continue
+
+            block = widget_name in HOTKEY_UI_ITEMS
+            if block:
+                # Don't re-register hotkeys for every field being restored.
+                widget.blockSignals(True)
+            _write_widget(widget, self.schema[widget_name].value_type, value)
+            if block:
+                widget.blockSignals(False)
+
+    def save(self, panel, widget_names=None):
+        """
+        Write the values of the panel's widgets which differ from what the file holds, in one go.
+
+        Args:
+            panel (GapframesPanel): the panel whose widgets to save
+            widget_names (iterable, optional): only save these widgets, all of the schema's if not given
+
+        Return:
+            int: number of values written
+        """
+        written = 0
+        for widget_name in widget_names or self.schema:
+            widget = self._find_widget(panel, widget_name)
+            if widget is None:
+                continue
+            spec = self.schema[widget_name]
+            value = _read_widget(widget, spec.value_type)
+            if widget_name not in self._stored:
+                self.value(widget_name)
+            # Compared the way it would be read back, e.g. an empty field is the same as nothing saved.
+            if _to_type(value, spec.value_type) == self._stored[widget_name]:
+                continue
+            self.settings.setValue(spec.key, value)
+            self._stored[widget_name] = _to_type(value, spec.value_type)
+            written += 1
+
+        if written:
+            self.settings.sync()
+        return written
@@ -0,0 +1,155 @@
+"""
+Cooperative, time-sliced keyframe scanning on the Qt event loop.
+The Nuke API has to be called from the main thread, so instead of a worker thread the scan is
+split into small work units which a QTimer works through a few milliseconds at a time.
+"""
+import traceback
+from timeit import default_timer
+
+from PySide2 import QtCore
+
+from gapframes import gaps
+from gapframes.constants import SCAN_TICK_BUDGET_MS
+from gapframes.scan_stats import PHASE_MERGE
+
+
+class GapScanner(QtCore.QObject):
+    """
+    Drives an iterable of work units, each producing a sorted list of key frame numbers,
+    and merges their results as they arrive.
+
+    When given a focus frame, the scan is progressive: results are reported for a window around
+    that frame first, starting with the gap containing it, and the window grows geometrically on
+    each following tick once all work units are done.
+    """
+    progress = QtCore.Signal(int, int)  # Work units done, total work units.
+    keys_updated = QtCore.Signal(object)  # Merged keys so far.
+    finished = QtCore.Signal(object)  # All merged keys.
+    cancelled = QtCore.Signal(object)  # Merged keys found before cancelling.
+    failed = QtCore.Signal(str)  # Formatted traceback.
+
+    def __init__(self, tick_budget=SCAN_TICK_BUDGET_MS, parent=None):
+        """
+        Args:
+            tick_budget (int, optional): milliseconds of work to do per timer tick
+        """
+        super(GapScanner, self).__init__(parent)
+        self.tick_budget = tick_budget
+        self._work = None
+        self._total = 0
+        self._done = 0
+        self._keys = gaps.merge_key_arrays([])
+        self._focus_frame = None
+        self._windows = None
+        self._reported_count = -1
+        self._scan_stats = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(0)  # Tick whenever the event loop is idle.
+        self._timer.timeout.connect(self._tick)
+
+    def is_running(self):
+        return self._work is not None
+
+    def start(self, work_units, total=0, focus_frame=None, scan_stats=None):
+        """
+        Start a new scan, silently dropping any scan that is still running.
+
+        Args:
+            work_units (iterable): iterable yielding a sorted list of key frame numbers per work unit
+            total (int, optional): number of work units, for progress reporting
+            focus_frame (int/float, optional): frame to progressively report results outward from
+            scan_stats (ScanStats, optional): stats object to time the merging of keys in
+        """
+        self._stop()
+        self._work = iter(work_units)
+        self._total = total
+        self._done = 0
+        self._keys = gaps.merge_key_arrays([])
+        self._focus_frame = focus_frame
+        self._windows = None
+        self._reported_count = -1
+        self._scan_stats = scan_stats
+        self.progress.emit(self._done, self._total)
+        self._timer.start()
+
+    def cancel(self):
+        """
+        Stop the running scan, keeping whatever was found so far.
+        """
+        if not self.is_running():
+            return
+        self._stop()
+        self.cancelled.emit(self._keys)
+
+    def _stop(self):
+        self._timer.stop()
+        self._work = None
+        self._windows = None
+
+    def _report_keys(self, keys):
+        # Growing windows often add no keys, don't make listeners redo the same work.
+        if len(keys) != self._reported_count:
+            self._reported_count = len(keys)
+            self.keys_updated.emit(keys)
+
+    def _focus_window_keys(self):
+        """
+        Return:
+            array.array: the keys found so far within the first window around the focus frame
+        """
+        first_window = next(gaps.iter_expanding_windows(self._keys, self._focus_frame))
+        return gaps.window_keys(self._keys, *first_window)
+
+    def _tick(self):
+        if self._windows is not None:
+            self._grow_window()
+            return
+
+        deadline = default_timer() + (self.tick_budget / 1000.0)
+        new_keys = []
+        exhausted = False
+        try:
+            while default_timer() < deadline:
+                try:
+                    new_keys.append(next(self._work))
+                except StopIteration:
+                    exhausted = True
+                    break
+        except Exception:
+            self._stop()
+            self.failed.emit(traceback.format_exc())
+            return
+
+        if new_keys:
+            self._done += len(new_keys)
+            new_keys.append(self._keys)
+            merge_start = default_timer()
+            self._keys = gaps.merge_key_arrays(new_keys)
+            if self._scan_stats is not None:
+                self._scan_stats.add_phase_time(PHASE_MERGE, default_timer() - merge_start)
+                self._scan_stats.keys_found = len(self._keys)
+            self.progress.emit(self._done, self._total)
+
+        if self._focus_frame is None:
+            if exhausted:
+                self._stop()
+                self.finished.emit(self._keys)
+            elif new_keys:
+                self.keys_updated.emit(self._keys)
+            return
+
+        if new_keys:
+            self._report_keys(self._focus_window_keys())
+        if exhausted:
+            # All keys are known, widen the reported window from now on.
+            self._windows = gaps.iter_expanding_windows(self._keys, self._focus_frame)
+
+    def _grow_window(self):
+        try:
+            window = next(self._windows)
+        except StopIteration:
+            self._stop()
+            self.finished.emit(self._keys)
+            return
+        self._report_keys(gaps.window_keys(self._keys, *window))
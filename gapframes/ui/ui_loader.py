@@ -0,0 +1,134 @@
+"""
+Builds the panel's widgets from a Python module compiled from GapframesPanel.ui, instead of parsing
+the XML with QUiLoader every time. The compiled module is cached per version of the .ui file.
+
+Compile ahead of time, e.g. when installing the tool, with:
+    python -m gapframes.ui.ui_loader
+"""
+import io
+import os
+import subprocess
+import sys
+import zlib
+
+import PySide2
+from PySide2 import QtUiTools, QtWidgets
+
+from gapframes.constants import PANEL_UI_PATH, UI_CACHE_DIR
+
+try:
+    from importlib.util import module_from_spec, spec_from_file_location
+except ImportError:  # Python 2
+    import imp
+    module_from_spec = spec_from_file_location = None
+
+# Name uic gives the class setting up the widgets, from the .ui file's <class> tag.
+FORM_CLASS_NAME = "Ui_GapframesPanel"
+
+
+def compiled_ui_path(ui_path=PANEL_UI_PATH, cache_dir=UI_CACHE_DIR):
+    """
+    Args:
+        ui_path (str, optional): path of the .ui file
+        cache_dir (str, optional): directory compiled modules are cached in
+
+    Return:
+        str: path the compiled module of the .ui file's current version is cached at
+    """
+    ui_stat = os.stat(ui_path)
+    version = "{0}:{1}:{2}".format(os.path.abspath(ui_path), int(ui_stat.st_mtime), ui_stat.st_size)
+    version_key = zlib.crc32(version.encode("utf-8")) & 0xffffffff
+    return os.path.join(cache_dir, "GapframesPanel_ui_{0:08x}.py".format(version_key))
+
+def _compile_with_pyside2uic(ui_path, py_path):
+    import pyside2uic  # Shipped with older PySide2 versions, like Nuke 11 and 12 have.
+    with io.open(ui_path, "r", encoding="utf-8") as ui_file:
+        with open(py_path, "w") as py_file:
+            pyside2uic.compileUi(ui_file, py_file)
+
+def _compile_with_uic(ui_path, py_path):
+    # Newer PySide2 versions bundle Qt's uic instead, which can generate Python.
+    uic_path = os.path.join(os.path.dirname(PySide2.__file__), "uic")
+    if sys.platform.startswith("win"):
+        uic_path += ".exe"
+    if not os.path.isfile(uic_path):
+        raise OSError("uic not found: {0}".format(uic_path))
+    subprocess.check_call([uic_path, "-g", "python", "-o", py_path, ui_path])
+
+def compile_panel_ui(ui_path=PANEL_UI_PATH, py_path=None):
+    """
+    Compile the .ui file into a Python module.
+
+    Args:
+        ui_path (str, optional): path of the .ui file
+        py_path (str, optional): path to write the module to, defaults to its cache path
+
+    Raises:
+        ImportError/OSError/subprocess.CalledProcessError: if no ui compiler is available or it fails
+
+    Return:
+        str: path of the compiled module
+    """
+    py_path = py_path or compiled_ui_path(ui_path)
+    directory = os.path.dirname(py_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    # Written under another name first, so that a failed compile never leaves a broken module behind.
+    temp_path = py_path + ".tmp"
+    try:
+        try:
+            _compile_with_pyside2uic(ui_path, temp_path)
+        except ImportError:
+            _compile_with_uic(ui_path, temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if os.path.exists(py_path):
+        os.remove(py_path)  # os.rename can't replace files on Windows.
+    os.rename(temp_path, py_path)
+    return py_path
+
+def _import_compiled_ui(py_path):
+    module_name = os.path.splitext(os.path.basename(py_path))[0]
+    if spec_from_file_location is None:
+        return imp.load_source(module_name, py_path)
+    # Goes through the regular import machinery, so the module's bytecode gets cached too.
+    spec = spec_from_file_location(module_name, py_path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _load_compiled_ui(ui_path):
+    py_path = compiled_ui_path(ui_path)
+    if not os.path.isfile(py_path):
+        compile_panel_ui(ui_path, py_path)
+    form = getattr(_import_compiled_ui(py_path), FORM_CLASS_NAME)()
+
+    widget = QtWidgets.QMainWindow()
+    form.setupUi(widget)
+    # Expose child widgets as attributes of the top widget, the same way QUiLoader does.
+    for name, value in vars(form).items():
+        setattr(widget, name, value)
+    return widget
+
+def load_panel_ui(ui_path=PANEL_UI_PATH):
+    """
+    Build the widgets described by the panel's .ui file, from its compiled module if possible.
+
+    Args:
+        ui_path (str, optional): path of the .ui file
+
+    Return:
+        QMainWindow: the top widget, with every named child widget as an attribute
+    """
+    try:
+        return _load_compiled_ui(ui_path)
+    except Exception:
+        # No ui compiler, unwritable cache or a broken cached module, parse the .ui file instead.
+        return QtUiTools.QUiLoader().load(ui_path)
+
+
+if __name__ == "__main__":
+    print(compile_panel_ui())
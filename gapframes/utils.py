@@ -1,15 +1,155 @@
+import zlib
+from timeit import default_timer
+
 import nuke
 
-from constants import NUM_TYPES
+from gapframes import gap_queries, gaps
+from gapframes.constants import (GAPFRAME_TARGET_DISTANCES, KEY_CACHE_MAX_BYTES, KEY_CACHE_MAX_ENTRIES,
+                                 STATIC_KNOB_CLASSES)
+from gapframes.key_cache import KeyCache
+from gapframes.key_sources import KeySources
+from gapframes.scan_stats import PHASE_GAPS, PHASE_MERGE, PHASE_SCAN
+
+# Keys of every animated knob read so far, shared by all scans.
+# Entries are checked against a hash of their key frames, as knobChanged callbacks only fire for nodes with open
+# Properties panels and miss keys moved by scripts, tools or the Dope Sheet.
+KEY_CACHE = KeyCache(max_entries=KEY_CACHE_MAX_ENTRIES, max_bytes=KEY_CACHE_MAX_BYTES)
+_key_cache_callbacks_registered = False
+# {(node Class, number of knobs): tuple of names of knobs which can hold animation}
+_ANIMATABLE_KNOBS = {}
+
+
+# ============================================================================================
+# Keyframe cache.
+
+def _report_error(msg, error_type):
+    try:
+        # Imported here, so the keyframe utils also work where PySide2 isn't available, e.g. "nuke -t".
+        from gapframes.ui.communicator import COMMUNICATOR
+    except ImportError:
+        raise error_type(msg)
+    COMMUNICATOR.report_message_with_error(msg, error_type=error_type)
 
-from gapframes.ui.communicator import COMMUNICATOR
+def _invalidate_changed_knob():
+    KEY_CACHE.invalidate((nuke.thisNode().fullName(), nuke.thisKnob().name()))
+
+def _invalidate_destroyed_node():
+    KEY_CACHE.invalidate_node(nuke.thisNode().fullName())
+
+def register_key_cache_callbacks():
+    """
+    Make Nuke drop cached keys of knobs that change and of nodes that get deleted.
+    Safe to call more than once.
+    """
+    global _key_cache_callbacks_registered
+    if _key_cache_callbacks_registered:
+        return
+    nuke.addKnobChanged(_invalidate_changed_knob, nodeClass="*")
+    nuke.addOnDestroy(_invalidate_destroyed_node, nodeClass="*")
+    _key_cache_callbacks_registered = True
 
 
 # ============================================================================================
 # Keyframe utils.
 
+def _read_animatable_knob_names(all_knobs):
+    return tuple(name for name, knob in all_knobs.items() if knob.Class() not in STATIC_KNOB_CLASSES)
+
+def animatable_knob_names(node):
+    """
+    Names of the node's knobs which can hold animation. Worked out once per node Class and knob count,
+    since thousands of nodes of a script usually share only a handful of those, so that other nodes
+    don't need to list all of their knobs, hundreds on Roto or Tracker nodes.
+
+    Args:
+        node (Nuke Node): Nuke Node object
+
+    Return:
+        tuple: knob names, in the knob order of the first node of the Class and knob count
+    """
+    # User knobs add to the knob count, so it tells most nodes of the same Class with other user knobs apart.
+    schema_key = (node.Class(), node.numKnobs())
+    knob_names = _ANIMATABLE_KNOBS.get(schema_key)
+    if knob_names is None:
+        knob_names = _read_animatable_knob_names(node.knobs())
+        _ANIMATABLE_KNOBS[schema_key] = knob_names
+    return knob_names
+
+def needs_panel(knob):
+    """
+    Args:
+        knob (Nuke Knob): Nuke Knob object
+
+    Return:
+        bool: whether the knob's keys can only be read with its node's Properties panel open
+    """
+    if callable(getattr(knob, "animations", None)):
+        return False
+    # Not an Array_Knob, only worth opening the Properties panel for if it's animated at all.
+    is_animated = getattr(knob, "isAnimated", None)
+    return not callable(is_animated) or is_animated()
+
+def iter_knob_curve_keys(knob, node_name=None, scan_stats=None):
+    """
+    Lazily yield a knob's key frames, read from its animation curves only once the first key is asked for.
+    Nuke hands each curve's keys over as a whole, so while being merged the knob's keys are held as
+    a compact array, shared with the keyframe cache, rather than as Nuke's key objects.
+
+    Args:
+        knob (Nuke Knob): Nuke Knob object whose keys can be read without its Properties panel,
+            see needs_panel
+        node_name (str, optional): full name of the knob's node, if given the keys are cached
+        scan_stats (ScanStats, optional): stats object to record cache hits and misses in
+
+    Yield:
+        int/float: the next key frame number
+    """
+    for key in read_knob_keys(knob, node_name, scan_stats):
+        yield key
+
+def read_knob_keys(knob, node_name=None, scan_stats=None):
+    """
+    Read a knob's key frame numbers straight from its animation curves,
+    which doesn't need the node's Properties panel to be open.
+
+    Args:
+        knob (Nuke Knob): Nuke Knob object
+        node_name (str, optional): full name of the knob's node, if given the keys are cached
+        scan_stats (ScanStats, optional): stats object to record cache hits and misses in
+
+    Return:
+        array.array: sorted key frame numbers of every animated channel of the knob
+        or
+        NoneType: if the knob's keys can't be read from animation curves
+    """
+    if needs_panel(knob):
+        return None
+    animations = getattr(knob, "animations", None)
+    if not callable(animations):
+        return gaps.merge_key_arrays([])
+    curves = animations()
+    if not curves:
+        # Not animated, nothing worth caching.
+        return gaps.merge_key_arrays([])
+    curve_keys = [tuple(key.x for key in curve.keys()) for curve in curves]
+    if node_name is None:
+        return gaps.merge_key_arrays(curve_keys)
+
+    # The curves can't tell their keys apart without listing them, so the fingerprint hashes every curve's key
+    # frames, catching keys being added, removed or moved while no knobChanged callback fires.
+    # A hit still saves merging the curves and building the array.
+    fingerprint = hash(tuple(curve_keys))
+    cache_key = (node_name, knob.name())
+    keys = KEY_CACHE.get(cache_key, fingerprint)
+    if scan_stats is not None:
+        scan_stats.record_cache_lookup(keys is not None)
+    if keys is None:
+        keys = gaps.merge_key_arrays(curve_keys)
+        KEY_CACHE.put(cache_key, keys, fingerprint)
+    return keys
+
 def scan_node_for_keyframes(node, allow_knobs=None, exclude_knobs=None,
-                            boundary_in=None, boundary_out=None):
+                            boundary_in=None, boundary_out=None, panel_free=True, scan_stats=None):
     """
     Args:
         node (Nuke Node): Nuke Node object
@@ -20,36 +160,111 @@ def scan_node_for_keyframes(node, allow_knobs=None, exclude_knobs=None,
             will not be factored when finding the largest gap
         boundary_out (int, optional): any keyframes on the timeline above this number
             will not be factored when finding the largest gap
+        panel_free (bool, optional): read keys from animation curves where possible, only opening
+            the node's Properties panel for knobs that can't be read that way
+        scan_stats (ScanStats, optional): stats object to record the scan in
 
     Return:
         list: all key frame numbers for the node
     """
+    knob_keys = read_node_knob_keys(node, allow_knobs, exclude_knobs, panel_free, scan_stats)
+    knob_keys = gaps.clip_key_lists(knob_keys, boundary_in, boundary_out)
+    return gaps.merge_key_arrays(knob_keys).tolist()
+
+def read_node_knob_keys(node, allow_knobs=None, exclude_knobs=None, panel_free=True, scan_stats=None,
+                        with_names=False):
+    """
+    Read the keys of each of a node's scanned knobs, without merging them.
+
+    Args:
+        node (Nuke Node): Nuke Node object
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        panel_free (bool, optional): read keys from animation curves where possible, only opening
+            the node's Properties panel for knobs that can't be read that way
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        with_names (bool, optional): pair each knob's keys with the knob's name
+
+    Return:
+        list: one sorted sequence of key frame numbers per knob,
+              or (knob name, sorted key frame numbers) pairs if with_names is True
+    """
+    knobs = scanned_knobs(node, allow_knobs, exclude_knobs)
+    register_key_cache_callbacks()
+    node_name = node.fullName()
+    knob_keys = []
+    panel_knobs = []  # Knobs which need the Properties panel open to see their keyframes.
+    for knob in knobs:
+        key_list = read_knob_keys(knob, node_name, scan_stats) if panel_free else None
+        if key_list is None:
+            panel_knobs.append(knob)
+        else:
+            knob_keys.append((knob.name(), key_list))
+    knob_keys.extend(read_panel_knob_keys(node, panel_knobs, scan_stats))
+
+    if scan_stats is not None:
+        scan_stats.nodes_scanned += 1
+        scan_stats.knobs_scanned += len(knobs)
+    if with_names:
+        return knob_keys
+    return [key_list for _, key_list in knob_keys]
+
+def scanned_knobs(node, allow_knobs=None, exclude_knobs=None):
+    """
+    Args:
+        node (Nuke Node): Nuke Node object
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+
+    Return:
+        list: the node's knobs which can hold animation and pass the knob filters, in the node's knob order
+    """
+    # Already sets when called from a scan, then this costs nothing.
+    allow_knobs, exclude_knobs = gaps.compile_knob_filters(allow_knobs, exclude_knobs)
+    knob_names = animatable_knob_names(node)
+    knobs = [node.knob(name) for name in knob_names]
+    if any(knob is None for knob in knobs):
+        # As many knobs as other nodes of its Class, but user knobs with other names.
+        all_knobs = node.knobs()
+        knob_names = _read_animatable_knob_names(all_knobs)
+        knobs = [all_knobs[name] for name in knob_names]
+    if allow_knobs or exclude_knobs:
+        knobs = [knob for name, knob in zip(knob_names, knobs)
+                 if gaps.is_knob_scanned(name, allow_knobs, exclude_knobs)]
+    return knobs
+
+def read_panel_knob_keys(node, panel_knobs, scan_stats=None):
+    """
+    Read the keys of knobs that need their node's Properties panel open, opening it only for as long as it takes.
+
+    Args:
+        node (Nuke Node): Nuke Node object the knobs belong to
+        panel_knobs (list): the node's knobs to read, see needs_panel
+        scan_stats (ScanStats, optional): stats object to record the scan in
+
+    Return:
+        list: (knob name, sorted key frame numbers) pairs, one per knob
+    """
+    if not panel_knobs:
+        return []
     ctrl_panel_open = node.shown()
     if not ctrl_panel_open:
         # This is necessary to be able to see keyframes on knobs.
         nuke.show(node)
 
-    all_knobs = node.knobs()
-    if allow_knobs:
-        all_knobs = dict([(k, v) for k, v in all_knobs.items() if k in allow_knobs])
-    if exclude_knobs:
-        all_knobs = dict([(k, v) for k, v in all_knobs.items() if k not in exclude_knobs])
-
-    all_keys = set()
-    for knob in all_knobs.values():
-        key_list = knob.getKeyList()
-        if all(isinstance(obj, NUM_TYPES) for obj in (boundary_in, boundary_out)):
-            key_list = [k for k in key_list if boundary_in < k < boundary_out]
-        all_keys.update(key_list)
+    knob_keys = [(knob.name(), knob.getKeyList()) for knob in panel_knobs]
 
     if not ctrl_panel_open:
         # If node's Properties were closed to be begin with, close them again.
         node.hideControlPanel()
-
-    return sorted(all_keys)
+        if scan_stats is not None:
+            scan_stats.slow_path_nodes.append(node.fullName())
+    return knob_keys
 
 def get_all_key_frame_nums(nodes, allow_knobs=None, exclude_knobs=None,
-                           boundary_in=None, boundary_out=None):
+                           boundary_in=None, boundary_out=None, scan_stats=None, key_tolerance=0):
     """
     Find all key frame numbers for each node in nodes.
 
@@ -62,21 +277,193 @@ def get_all_key_frame_nums(nodes, allow_knobs=None, exclude_knobs=None,
             will not be factored when finding the largest gap
         boundary_out (int, optional): any keyframes on the timeline above this number
             will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
 
     Return:
         list: all key frame numbers
     """
-    all_keys = set()
+    return _merged_key_frame_nums(nodes, allow_knobs, exclude_knobs,
+                                  boundary_in, boundary_out, scan_stats, key_tolerance).tolist()
+
+def _merged_key_frame_nums(nodes, allow_knobs=None, exclude_knobs=None,
+                           boundary_in=None, boundary_out=None, scan_stats=None, key_tolerance=0):
+    """
+    Same as get_all_key_frame_nums, but keep the merged keys as an array for the gap engine.
+    """
+    node_keys = iter_node_keys(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats)
+    if scan_stats is None:
+        return gaps.merge_close_keys(gaps.merge_key_arrays(node_keys), key_tolerance)
+
+    # Scan first, so that the merge phase doesn't include the scanning time.
+    node_keys = list(node_keys)
+    with scan_stats.phase(PHASE_MERGE):
+        keyframes = gaps.merge_close_keys(gaps.merge_key_arrays(node_keys), key_tolerance)
+    scan_stats.keys_found = len(keyframes)
+    return keyframes
+
+def get_key_sources(nodes, allow_knobs=None, exclude_knobs=None,
+                    boundary_in=None, boundary_out=None, scan_stats=None):
+    """
+    Find all key frame numbers for each node in nodes, like get_all_key_frame_nums, with each key
+    tagged with the knobs it comes from in the same merge.
+
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+
+    Return:
+        KeySources: the merged keys and the (node name, knob name) sources of each of them
+    """
+    knob_records = {}
+    for _ in iter_node_keys(nodes, allow_knobs, exclude_knobs, scan_stats=scan_stats, knob_records=knob_records):
+        pass
+
+    tagged_key_arrays = [(source, gaps.clip_key_lists([keys], boundary_in, boundary_out)[0])
+                         for source, keys in knob_records.items()]
+    if scan_stats is None:
+        return KeySources(tagged_key_arrays)
+
+    with scan_stats.phase(PHASE_MERGE):
+        key_sources = KeySources(tagged_key_arrays)
+    scan_stats.keys_found = len(key_sources)
+    return key_sources
+
+def node_fingerprint(node):
+    """
+    Args:
+        node (Nuke Node): Nuke Node object
+
+    Return:
+        int: checksum of everything the node would save to the script, its animation included
+    """
+    knobs_str = node.writeKnobs(nuke.TO_SCRIPT | nuke.WRITE_NON_DEFAULT_ONLY)
+    if not isinstance(knobs_str, bytes):
+        # Python 2 strings already are bytes, encoding them would decode them as ASCII first.
+        knobs_str = knobs_str.encode("utf-8")
+    return zlib.crc32(knobs_str) & 0xffffffff
+
+def _record_node_time(scan_stats, node_name, start):
+    elapsed = default_timer() - start
+    scan_stats.add_phase_time(PHASE_SCAN, elapsed)
+    scan_stats.record_node_time(node_name, elapsed)
+
+def iter_node_keys(nodes, allow_knobs=None, exclude_knobs=None,
+                   boundary_in=None, boundary_out=None, scan_stats=None, sidecar=None, node_records=None,
+                   knob_records=None):
+    """
+    Lazily scan nodes for keyframes, one node per iteration, so that a scan can be spread
+    over several steps of the Qt event loop.
+
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        sidecar (Sidecar, optional): keys saved by an earlier scan, reused for nodes whose
+            content fingerprint hasn't changed since
+        node_records (dict, optional): if given, every node's unbounded keys and content fingerprint
+            get recorded in it as {node name: (fingerprint, array.array of keys)}, to save a sidecar with
+        knob_records (dict, optional): if given, every knob's unbounded keys get recorded in it as
+            {(node name, knob name): keys}, to tag merged keys with their sources, see key_sources.
+            Nodes reused from the sidecar are only known as a whole, under a knob name of None.
+
+    Yield:
+        array.array: all key frame numbers for the next node
+    """
+    allow_knobs, exclude_knobs = gaps.compile_knob_filters(allow_knobs, exclude_knobs)
     for node in nodes:
-        node_keys = scan_node_for_keyframes(node, allow_knobs, exclude_knobs,
-                                            boundary_in, boundary_out)
-        all_keys.update(node_keys)
+        start = default_timer()
+        node_name = node.fullName()
+        keys = None
+        if node_records is not None:
+            fingerprint = node_fingerprint(node)
+            keys = sidecar.node_keys(node_name, fingerprint) if sidecar is not None else None
+            if keys is not None:
+                if scan_stats is not None:
+                    scan_stats.nodes_reused += 1
+                if knob_records is not None:
+                    knob_records[(node_name, None)] = keys
+
+        if keys is None:
+            knob_keys = read_node_knob_keys(node, allow_knobs, exclude_knobs, scan_stats=scan_stats, with_names=True)
+            keys = gaps.merge_key_arrays(key_list for _, key_list in knob_keys)
+            if knob_records is not None:
+                for knob_name, key_list in knob_keys:
+                    knob_records[(node_name, knob_name)] = key_list
 
-    return sorted(all_keys)
+        if node_records is not None:
+            node_records[node_name] = (fingerprint, keys)
+        if scan_stats is not None:
+            _record_node_time(scan_stats, node_name, start)
+        yield gaps.clip_key_lists([keys], boundary_in, boundary_out)[0]
 
-def find_all_gaps(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None):
+def iter_gaps(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+              scan_stats=None, key_tolerance=0):
     """
-    Given a sorted array of any numbers, find each chronological pair of keyframe numbers.
+    Stream the keyframe gaps of the provided nodes, one at a time. The keys of every knob are merged
+    lazily, so neither the merged keys nor the gaps are ever stored all at once. Knobs readable from their
+    animation curves are only read as the merge reaches them, just the knobs needing a Properties panel
+    get read up front.
+
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+
+    Yield:
+        tuple: (start, end) of the next gap, chronologically
+    """
+    allow_knobs, exclude_knobs = gaps.compile_knob_filters(allow_knobs, exclude_knobs)
+    register_key_cache_callbacks()
+    key_iterables = []
+    for node in nodes:
+        start = default_timer()
+        node_name = node.fullName()
+        knobs = scanned_knobs(node, allow_knobs, exclude_knobs)
+        key_iterables.extend(iter_knob_curve_keys(knob, node_name, scan_stats)
+                             for knob in knobs if not needs_panel(knob))
+        # Properties panels can't stay open while the merge is consumed, so those knobs are buffered.
+        panel_knob_keys = read_panel_knob_keys(node, [knob for knob in knobs if needs_panel(knob)], scan_stats)
+        key_iterables.extend(key_list for _, key_list in panel_knob_keys)
+        if scan_stats is not None:
+            scan_stats.nodes_scanned += 1
+            scan_stats.knobs_scanned += len(knobs)
+            _record_node_time(scan_stats, node_name, start)
+
+    for gap in gaps.iter_gaps(key_iterables, boundary_in, boundary_out, key_tolerance):
+        yield gap
+
+def _compute_gap_arrays(keyframes, collapse_dense=False):
+    if collapse_dense:
+        return gaps.split_dense_segments(keyframes)[0]
+    return gaps.compute_gaps(keyframes)
+
+def find_gap_arrays(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+                    scan_stats=None, key_tolerance=0, collapse_dense=False):
+    """
+    Find all keyframe gaps in the provided nodes, in columnar form.
 
     Args:
         nodes (list): list of nodes to get all key frames for
@@ -87,27 +474,94 @@ def find_all_gaps(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None,
             will not be factored when finding the largest gap
         boundary_out (int, optional): any keyframes on the timeline above this number
             will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
 
     Return:
-        list: list of tuples, each containing neighbouring numbers
+        GapArrays: parallel arrays of gap starts, ends and lengths
     """
-    keyframes = get_all_key_frame_nums(nodes, allow_knobs, exclude_knobs,
-                                       boundary_in, boundary_out)
+    keyframes = _merged_key_frame_nums(nodes, allow_knobs, exclude_knobs,
+                                       boundary_in, boundary_out, scan_stats, key_tolerance)
     if len(keyframes) < 2:
         error_msg = "Need input with 2 or more key frames."
-        COMMUNICATOR.report_message_with_error(error_msg, error_type=ValueError)
+        _report_error(error_msg, ValueError)
+
+    if scan_stats is None:
+        return _compute_gap_arrays(keyframes, collapse_dense)
+    with scan_stats.phase(PHASE_GAPS):
+        return _compute_gap_arrays(keyframes, collapse_dense)
+
+def find_all_gaps(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+                  scan_stats=None, key_tolerance=0, collapse_dense=False):
+    """
+    Given a sorted array of any numbers, find each chronological pair of keyframe numbers.
+
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
+
+    Return:
+        list: list of tuples, each containing neighbouring numbers
+    """
+    gap_arrays = find_gap_arrays(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats,
+                                 key_tolerance, collapse_dense)
+    return gaps.gap_pairs(gap_arrays)
 
-    all_gaps = []
-    for x in range(1, len(keyframes)):
-        first = keyframes[x-1]
-        second = keyframes[x]
+def find_largest_gaps(nodes, count, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+                      scan_stats=None, key_tolerance=0, collapse_dense=False, min_length=None):
+    """
+    Find the longest keyframe gaps in the provided nodes, in a single pass over the streamed gaps
+    which never holds more than count of them.
 
-        all_gaps.append((first, second))
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        count (int): how many gaps to return
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
+        min_length (int/float, optional): leave out gaps shorter than this many frames
 
-    return all_gaps
+    Return:
+        list: (start, end) tuples of the longest gaps, longest first, empty if there are fewer than 2 keys
+    """
+    if collapse_dense:
+        # Telling baked runs apart needs the merged keys, the gaps can't be streamed.
+        keyframes = _merged_key_frame_nums(nodes, allow_knobs, exclude_knobs,
+                                           boundary_in, boundary_out, scan_stats, key_tolerance)
+        gap_iter = zip(*_compute_gap_arrays(keyframes, collapse_dense)[:2])
+    else:
+        gap_iter = iter_gaps(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats,
+                             key_tolerance)
+    if min_length:
+        gap_iter = gap_queries.iter_gaps_within(gap_iter, min_length)
+    return gap_queries.largest_gaps(gap_iter, count)
 
 def find_largest_gap(nodes, allow_knobs=None, exclude_knobs=None,
-                            boundary_in=None, boundary_out=None):
+                            boundary_in=None, boundary_out=None, scan_stats=None, key_tolerance=0,
+                            collapse_dense=False):
     """
     Find the keyframe pair which have the biggest difference out of each pair of discovered
     keyframes in the provided nodes.
@@ -121,17 +575,77 @@ def find_largest_gap(nodes, allow_knobs=None, exclude_knobs=None,
             will not be factored when finding the largest gap
         boundary_out (int, optional): any keyframes on the timeline above this number
             will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
 
     Return:
         tuple: keyframes at the beginning and end of the largest gap
+        or
+        NoneType: if there is no gap, e.g. fewer than 2 keys were found
+    """
+    largest = find_largest_gaps(nodes, 1, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats,
+                                key_tolerance, collapse_dense)
+    return largest[0] if largest else None
+
+def find_review_frames(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+                       scan_stats=None, key_tolerance=0, collapse_dense=False, distances=GAPFRAME_TARGET_DISTANCES):
+    """
+    Find the gapframes of every keyframe gap in the provided nodes, as a frame range to render or flipbook,
+    e.g. nuke.execute(write_node, nuke.FrameRanges(find_review_frames(nodes))).
+
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
+        distances (iterable, optional): percentages into each gap at which to place gapframes
+
+    Return:
+        str: the gapframes, e.g. "12 18 24-25 40", see gaps.format_frame_ranges
+    """
+    gap_arrays = find_gap_arrays(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats,
+                                 key_tolerance, collapse_dense)
+    return gaps.format_frame_ranges(gaps.gapframe_targets(gap_arrays.starts, gap_arrays.ends, distances))
+
+def find_gap_sources(nodes, allow_knobs=None, exclude_knobs=None, boundary_in=None, boundary_out=None,
+                     scan_stats=None, key_tolerance=0, collapse_dense=False):
     """
-    all_gaps = find_all_gaps(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out)
-    
-    max_diff = largest_gap = 0
-    for start, end in all_gaps:
-        diff = end - start
-        if diff > max_diff:
-            max_diff = diff
-            largest_gap = (start, end)
+    Find all keyframe gaps in the provided nodes, along with the nodes and knobs whose keys bound each gap,
+    from a single scan of every node.
 
-    return largest_gap
+    Args:
+        nodes (list): list of nodes to get all key frames for
+        allow_knobs (list, optional): list of specific knobs names which to scan for keyframes
+        exclude_knobs (list, optional): list of knobs names which to ignore
+                                        when scanning for keyframes
+        boundary_in (int, optional): any keyframes on the timeline below this number
+            will not be factored when finding the largest gap
+        boundary_out (int, optional): any keyframes on the timeline above this number
+            will not be factored when finding the largest gap
+        scan_stats (ScanStats, optional): stats object to record the scan in
+        key_tolerance (int/float, optional): keys closer together than this many frames are merged
+            into one, see gaps.merge_close_keys
+        collapse_dense (bool, optional): leave out the gaps within runs of baked keys,
+            see gaps.split_dense_segments
+
+    Return:
+        list: (start, end, start sources, end sources) of each gap, chronologically,
+              sources being lists of (node name, knob name) tuples
+    """
+    key_sources = get_key_sources(nodes, allow_knobs, exclude_knobs, boundary_in, boundary_out, scan_stats)
+    keyframes = gaps.merge_close_keys(key_sources.keys, key_tolerance)
+    gap_arrays = _compute_gap_arrays(keyframes, collapse_dense)
+    return [(start, end) + key_sources.gap_sources(start, end, key_tolerance)
+            for start, end in zip(gap_arrays.starts, gap_arrays.ends)]
@@ -0,0 +1,350 @@
+"""
+In-process stand-in for the parts of the nuke module gapframes uses, so its scanning code can be
+benchmarked outside of Nuke. Install it with install() before importing any Nuke-side gapframes module.
+
+Every call that would cross into Nuke counts as an API call and can be given an artificial latency,
+to mimic the cost of the real Python bindings.
+"""
+import sys
+from timeit import default_timer
+
+TO_SCRIPT = 1
+WRITE_NON_DEFAULT_ONLY = 16
+
+_state = {"latency": 0.0, "api_calls": 0, "frame": 1, "root": None, "nodes_by_name": {},
+          "this_node": None, "this_knob": None}
+# {callback type: [(func, args, kwargs, nodeClass)]}
+callbacks = {"onCreate": [], "onDestroy": [], "knobChanged": []}
+
+
+def install():
+    """
+    Make "import nuke" return this module.
+    """
+    sys.modules["nuke"] = sys.modules[__name__]
+
+def set_latency(seconds):
+    """
+    Args:
+        seconds (float): time every API call busy-waits for, 0 to disable
+    """
+    _state["latency"] = seconds
+
+def api_calls():
+    """
+    Return:
+        int: API calls made since the last reset_api_calls()
+    """
+    return _state["api_calls"]
+
+def reset_api_calls():
+    _state["api_calls"] = 0
+
+def _api_call():
+    _state["api_calls"] += 1
+    latency = _state["latency"]
+    if latency:
+        # Busy-wait, sleeping isn't precise enough for microsecond latencies.
+        end = default_timer() + latency
+        while default_timer() < end:
+            pass
+
+def set_scene(root):
+    """
+    Make a Root node, as built by scenes.build_scene(), the current script.
+    """
+    _state["root"] = root
+    _state["nodes_by_name"] = dict((node.fullName(), node) for node in root.nodes(recurse=True))
+    for callback_list in callbacks.values():
+        del callback_list[:]
+
+
+# ============================================================================================
+# Animation.
+
+class AnimationKey(object):
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y=0.0):
+        self.x = x
+        self.y = y
+
+
+class AnimationCurve(object):
+
+    def __init__(self, frames):
+        self._frames = frames
+
+    def keys(self):
+        _api_call()
+        # Like the real bindings, every call hands out new key objects.
+        return [AnimationKey(frame) for frame in self._frames]
+
+    def size(self):
+        _api_call()
+        return len(self._frames)
+
+
+# ============================================================================================
+# Knobs.
+
+class Knob(object):
+    """
+    Knob which can't be read through animation curves. Its keys, if it has any, are only
+    visible through getKeyList() while its node's Properties panel is open, like Roto shapes.
+    """
+
+    def __init__(self, name, knob_class="Knob", channels=None):
+        """
+        Args:
+            name (str): knob name
+            knob_class (str, optional): what Class() reports
+            channels (list, optional): one list of key frames per channel
+        """
+        self._name = name
+        self._class = knob_class
+        self._channels = list(channels or [])
+        self.node = None
+
+    def name(self):
+        _api_call()
+        return self._name
+
+    def Class(self):
+        _api_call()
+        return self._class
+
+    def isAnimated(self):
+        _api_call()
+        return any(self._channels)
+
+    def getKeyList(self):
+        _api_call()
+        if self.node is None or not self.node._shown:
+            return []
+        return sorted(set(frame for frames in self._channels for frame in frames))
+
+    def to_script(self):
+        if not any(self._channels):
+            return ""
+        curves = " ".join("{curve " + " ".join("x{0} 0".format(frame) for frame in frames) + "}"
+                          for frames in self._channels)
+        return "{0} {{{1}}}\n".format(self._name, curves)
+
+
+class Array_Knob(Knob):
+    """
+    Numeric knob whose animation curves are readable without opening any panel.
+    """
+
+    def __init__(self, name, knob_class="Double_Knob", channels=None):
+        super(Array_Knob, self).__init__(name, knob_class, channels)
+        self._curves = [AnimationCurve(frames) for frames in self._channels if frames]
+
+    def animations(self):
+        _api_call()
+        return list(self._curves)
+
+
+# ============================================================================================
+# Nodes.
+
+class Node(object):
+
+    def __init__(self, node_class, name, knobs=()):
+        self._class = node_class
+        self._name = name
+        self._knobs = {}
+        self._shown = False
+        self._selected = False
+        self.parent = None
+        for knob in knobs:
+            self.addKnob(knob)
+
+    def addKnob(self, knob):
+        knob.node = self
+        self._knobs[knob._name] = knob
+
+    def Class(self):
+        _api_call()
+        return self._class
+
+    def name(self):
+        _api_call()
+        return self._name
+
+    def fullName(self):
+        _api_call()
+        return self._full_name()
+
+    def _full_name(self):
+        if self.parent is None or self.parent.parent is None:
+            return self._name
+        return self.parent._full_name() + "." + self._name
+
+    def knobs(self):
+        _api_call()
+        return dict(self._knobs)
+
+    def knob(self, name):
+        _api_call()
+        return self._knobs.get(name)
+
+    def __getitem__(self, name):
+        return self.knob(name)
+
+    def numKnobs(self):
+        _api_call()
+        return len(self._knobs)
+
+    def shown(self):
+        _api_call()
+        return self._shown
+
+    def showControlPanel(self):
+        _api_call()
+        self._shown = True
+
+    def hideControlPanel(self):
+        _api_call()
+        self._shown = False
+
+    def isSelected(self):
+        _api_call()
+        return self._selected
+
+    def setSelected(self, selected):
+        _api_call()
+        self._selected = selected
+
+    def writeKnobs(self, flags=0):
+        _api_call()
+        return "".join(knob.to_script() for knob in self._knobs.values())
+
+
+class Group(Node):
+
+    def __init__(self, node_class="Group", name="Group1", knobs=()):
+        super(Group, self).__init__(node_class, name, knobs)
+        self._nodes = []
+
+    def add(self, node):
+        node.parent = self
+        self._nodes.append(node)
+        return node
+
+    def nodes(self, recurse=False):
+        result = []
+        for node in self._nodes:
+            result.append(node)
+            if recurse and isinstance(node, Group):
+                result.extend(node.nodes(recurse=True))
+        return result
+
+
+class Root(Group):
+
+    def __init__(self, script_name="benchmark.nk"):
+        super(Root, self).__init__("Root", "root")
+        self._script_name = script_name
+
+    def name(self):
+        _api_call()
+        return self._script_name
+
+
+# ============================================================================================
+# Module functions.
+
+def root():
+    _api_call()
+    return _state["root"]
+
+def allNodes(filter=None, group=None, recurseGroups=False):
+    _api_call()
+    group = group if group is not None else _state["root"]
+    nodes = group.nodes(recurse=recurseGroups)
+    if filter:
+        nodes = [node for node in nodes if node._class == filter]
+    return nodes
+
+def selectedNodes(filter=None):
+    _api_call()
+    return [node for node in allNodes(filter) if node._selected]
+
+def toNode(name):
+    _api_call()
+    return _state["nodes_by_name"].get(name)
+
+def frame(frame_number=None):
+    _api_call()
+    if frame_number is not None:
+        _state["frame"] = frame_number
+    return _state["frame"]
+
+def show(node, forceFloat=False):
+    node.showControlPanel()
+
+def thisNode():
+    return _state["this_node"]
+
+def thisKnob():
+    return _state["this_knob"]
+
+def _add_callback(callback_type, func, args=(), kwargs=None, nodeClass="*"):
+    callbacks[callback_type].append((func, args, kwargs or {}, nodeClass))
+
+def addOnCreate(func, args=(), kwargs=None, nodeClass="*"):
+    _add_callback("onCreate", func, args, kwargs, nodeClass)
+
+def addOnDestroy(func, args=(), kwargs=None, nodeClass="*"):
+    _add_callback("onDestroy", func, args, kwargs, nodeClass)
+
+def addKnobChanged(func, args=(), kwargs=None, nodeClass="*"):
+    _add_callback("knobChanged", func, args, kwargs, nodeClass)
+
+def message(msg):
+    pass
+
+def tprint(*args, **kwargs):
+    pass
+
+
+class Menu(object):
+    """
+    Accepts menu and command registrations without doing anything with them.
+    """
+
+    def __init__(self, name=""):
+        self._name = name
+        self._items = {}
+
+    def addMenu(self, name, *args, **kwargs):
+        return self._items.setdefault(name, Menu(name))
+
+    def menu(self, name):
+        return self.addMenu(name)
+
+    def addSeparator(self, *args, **kwargs):
+        pass
+
+    def setShortcut(self, shortcut):
+        pass
+
+    def addCommand(self, name, *args, **kwargs):
+        return self._items.setdefault(name, Menu(name))
+
+    def findItem(self, name):
+        return self._items.get(name)
+
+    def removeItem(self, name):
+        self._items.pop(name, None)
+
+
+_MENUS = {}
+
+def menu(name):
+    return _MENUS.setdefault(name, Menu(name))
+
+def toolbar(name):
+    return menu(name)
@@ -0,0 +1,293 @@
+"""
+Time gapframes' keyframe scanning and gap list building on synthetic scripts, outside of Nuke.
+
+Usage:
+    python misc/benchmarks/run_benchmarks.py [--scales 10,1000] [--profiles sparse] [--latency-us 2]
+                                             [--output results.json] [--compare baseline.json]
+
+Reports the best wall time of a few runs and the peak traced memory of one run, per benchmark,
+scene profile and node count, and saves them as JSON so later runs can be compared against them.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import tracemalloc
+from timeit import default_timer
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(os.path.dirname(BENCHMARKS_DIR)))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import fake_nuke
+import scenes
+
+fake_nuke.install()
+
+from gapframes import gaps, utils
+from gapframes.key_sources import KeySources
+from gapframes.gaps_container import GapCursor, GapsContainer
+
+try:
+    from gapframes.ui.gaps_model import GapsListModel
+except ImportError as error:
+    GapsListModel = None
+    MODEL_SKIP_REASON = "gapframes.ui.gaps_model not importable: {0}".format(error)
+
+DEFAULT_SCALES = "10,100,1000,10000,50000"
+DEFAULT_PROFILES = ",".join(sorted(scenes.PROFILES))
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+
+class Scene(object):
+    """
+    A generated script, plus what the benchmarks need out of it.
+    """
+
+    def __init__(self, node_count, profile, group_depth, panel_only_ratio):
+        self.root = scenes.build_scene(node_count, profile, group_depth=group_depth,
+                                       panel_only_ratio=panel_only_ratio)
+        self.nodes = scenes.animated_nodes(self.root)
+        # Computed straight from the scene, so the container benchmarks don't depend on the scanning code.
+        channels = [frames for node in self.nodes for knob in node._knobs.values() for frames in knob._channels]
+        self.keys = gaps.merge_key_arrays(channels)
+        self.gap_arrays = gaps.compute_gaps(self.keys)
+        self.collapsed_gap_arrays, self.dense_segments = gaps.split_dense_segments(self.keys)
+        self.knob_records = dict(((node.fullName(), knob_name), gaps.merge_key_arrays(knob._channels))
+                                 for node in self.nodes for knob_name, knob in node._knobs.items())
+
+
+# ============================================================================================
+# Benchmarks, each returns the function to time, after doing any untimed setup.
+
+def bench_scan_cold(scene):
+
+    def run():
+        utils.KEY_CACHE.clear()
+        for node in scene.nodes:
+            utils.scan_node_for_keyframes(node)
+    return run
+
+def bench_scan_cached(scene):
+    utils.KEY_CACHE.clear()
+    for node in scene.nodes:
+        utils.scan_node_for_keyframes(node)
+
+    def run():
+        for node in scene.nodes:
+            utils.scan_node_for_keyframes(node)
+    return run
+
+def bench_find_all_gaps(scene):
+    if len(scene.keys) < 2:
+        return "scene has fewer than 2 keys"
+
+    def run():
+        utils.KEY_CACHE.clear()
+        utils.find_all_gaps(scene.nodes)
+    return run
+
+def bench_find_largest_gap(scene):
+    if len(scene.keys) < 2:
+        return "scene has fewer than 2 keys"
+
+    def run():
+        utils.KEY_CACHE.clear()
+        utils.find_largest_gap(scene.nodes)
+    return run
+
+def bench_rewindow(scene):
+    # The panel's Scan Boundary cuts the cached full-range keys, here for 100 playhead positions.
+    if len(scene.keys) < 2:
+        return "scene has fewer than 2 keys"
+    first, last = scene.keys[0], scene.keys[-1]
+    frames = [first + (last - first) * step / 100.0 for step in range(100)]
+
+    def run():
+        for frame in frames:
+            gaps.compute_gaps(gaps.clip_keys(scene.keys, frame - 50, frame + 50))
+    return run
+
+def bench_key_sources(scene):
+    # Tagging every key with its node and knob, then looking up the sources of every gap.
+    def run():
+        key_sources = KeySources(scene.knob_records.items())
+        for start, end in zip(scene.gap_arrays.starts, scene.gap_arrays.ends):
+            key_sources.gap_sources(start, end)
+    return run
+
+def bench_container_build(scene):
+    def run():
+        GapsContainer.from_gap_arrays(scene.gap_arrays)
+    return run
+
+def bench_container_build_collapsed(scene):
+    def run():
+        GapsContainer.from_gap_arrays(scene.collapsed_gap_arrays, dense_segments=scene.dense_segments)
+    return run
+
+def bench_container_sort(scene):
+    # Sort orders are cached per container, so each run sorts a new one, its construction included.
+    def run():
+        container = GapsContainer.from_gap_arrays(scene.gap_arrays)
+        container.sort_by_largest_gap()
+        container.sort_by_smallest_gap()
+        container.sort_chronologically()
+    return run
+
+def bench_cursor_cycle(scene):
+    # 1000 presses of Cycle Next, as the hotkey navigator handles them within a burst.
+    if not len(scene.gap_arrays.starts):
+        return "scene has no gaps"
+    container = GapsContainer.from_gap_arrays(scene.gap_arrays)
+    cursor = GapCursor(container)
+    cursor.gapframe(50)
+
+    def run():
+        for _ in range(1000):
+            cursor.cycle(1, distance=50)
+            cursor.gapframe(50)
+    return run
+
+def bench_panel_population(scene):
+    if GapsListModel is None:
+        return MODEL_SKIP_REASON
+    container = GapsContainer.from_gap_arrays(scene.gap_arrays)
+    model = GapsListModel()
+
+    def run():
+        model.set_container(container)
+        for row in range(model.rowCount()):
+            model.data(model.index(row))
+    return run
+
+BENCHMARKS = [("scan_cold", bench_scan_cold), ("scan_cached", bench_scan_cached),
+              ("find_all_gaps", bench_find_all_gaps), ("find_largest_gap", bench_find_largest_gap),
+              ("rewindow", bench_rewindow), ("key_sources", bench_key_sources),
+              ("container_build", bench_container_build),
+              ("container_build_collapsed", bench_container_build_collapsed),
+              ("container_sort", bench_container_sort), ("cursor_cycle", bench_cursor_cycle),
+              ("panel_population", bench_panel_population)]
+
+
+# ============================================================================================
+# Running.
+
+def measure(run, repeat):
+    """
+    Return:
+        dict: best wall time in seconds, peak traced memory in bytes and fake API calls of one run
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        fake_nuke.reset_api_calls()
+        start = default_timer()
+        run()
+        timings.append(default_timer() - start)
+    api_calls = fake_nuke.api_calls()
+
+    # Traced separately, tracing slows everything down too much to time at once.
+    latency = fake_nuke._state["latency"]
+    fake_nuke.set_latency(0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        fake_nuke.set_latency(latency)
+
+    return {"seconds": min(timings), "peak_bytes": peak, "api_calls": api_calls}
+
+def run_benchmarks(scales, profiles, repeat=3, group_depth=2, panel_only_ratio=0.0, only=None):
+    """
+    Return:
+        list: one result dict per benchmark, profile and node count
+    """
+    results = []
+    for profile in profiles:
+        for node_count in scales:
+            scene = Scene(node_count, profile, group_depth, panel_only_ratio)
+            for name, bench in BENCHMARKS:
+                if only and name not in only:
+                    continue
+                result = {"benchmark": name, "profile": profile, "nodes": node_count}
+                run = bench(scene)
+                if isinstance(run, str):
+                    result["skipped"] = run
+                else:
+                    result.update(measure(run, repeat))
+                results.append(result)
+                print(format_result(result))
+                sys.stdout.flush()
+            del scene
+    return results
+
+def _result_key(result):
+    return result["benchmark"], result["profile"], result["nodes"]
+
+def format_result(result, baseline=None):
+    label = "{benchmark:<25} {profile:<9} {nodes:>6} nodes".format(**result)
+    if "skipped" in result:
+        return "{0}  skipped: {1}".format(label, result["skipped"])
+    line = "{0}  {1:10.4f} s  {2:10.1f} KiB peak  {3:>10} api calls".format(
+        label, result["seconds"], result["peak_bytes"] / 1024.0, result["api_calls"])
+    if baseline and "seconds" in baseline:
+        line += "  ({0:.2f}x time, {1:.2f}x memory vs baseline)".format(
+            result["seconds"] / max(baseline["seconds"], 1e-9),
+            result["peak_bytes"] / float(max(baseline["peak_bytes"], 1)))
+    return line
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = dict((_result_key(result), result) for result in json.load(baseline_file)["results"])
+    print("\nCompared to {0}:".format(baseline_path))
+    for result in results:
+        print(format_result(result, baseline.get(_result_key(result))))
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma separated node counts")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES,
+                        help="comma separated key density profiles, out of: " + DEFAULT_PROFILES)
+    parser.add_argument("--benchmarks", help="comma separated benchmark names, all if omitted")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the best one is kept")
+    parser.add_argument("--latency-us", type=float, default=0.0,
+                        help="artificial latency of every fake nuke API call, in microseconds")
+    parser.add_argument("--group-depth", type=int, default=2, help="nesting depth of the groups holding the nodes")
+    parser.add_argument("--panel-only-ratio", type=float, default=0.0,
+                        help="share of nodes with keys only readable through their Properties panel")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to save the results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to compare this run against")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = _parse_args(argv)
+    fake_nuke.set_latency(args.latency_us / 1e6)
+    scales = [int(scale) for scale in args.scales.split(",")]
+    profiles = args.profiles.split(",")
+    only = set(args.benchmarks.split(",")) if args.benchmarks else None
+
+    results = run_benchmarks(scales, profiles, args.repeat, args.group_depth, args.panel_only_ratio, only)
+    report = {
+        "meta": {"date": datetime.datetime.now().isoformat(), "python": platform.python_version(),
+                 "platform": platform.platform(), "latency_us": args.latency_us, "repeat": args.repeat,
+                 "group_depth": args.group_depth, "panel_only_ratio": args.panel_only_ratio},
+        "results": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print("Saved results to {0}".format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Deterministic synthetic scripts for the fake nuke module, from a handful of nodes up to tens of thousands.
+"""
+import random
+
+import fake_nuke
+
+# Knobs every generated node carries which can never be animated, like a real node's tabs and labels.
+STATIC_KNOBS = [("User", "Tab_Knob"), ("label", "Multiline_Eval_String_Knob"), ("note_font", "Font_Knob"),
+                ("help", "Help_Knob"), ("reload", "PyScript_Knob"), ("channels", "ChannelMask_Knob"),
+                ("divider", "Text_Knob"), ("file", "File_Knob")]
+# (knob name, knob Class, channel count) of the numeric knobs generated nodes carry.
+ARRAY_KNOBS = [("translate", "XY_Knob", 2), ("rotate", "Double_Knob", 1), ("scale", "WH_Knob", 2),
+               ("center", "XY_Knob", 2), ("mix", "Double_Knob", 1), ("xpos", "Int_Knob", 1),
+               ("ypos", "Int_Knob", 1)]
+
+# name: (keys per animated channel, animated knob count, frame range, whether keys sit on sub-frames)
+PROFILES = {
+    "sparse": (4, 2, (1, 2000), False),
+    "dense": (120, 3, (1, 2000), False),
+    "subframe": (24, 2, (1, 500), True),
+    # A key on every frame, like baked trackers and cameras.
+    "baked": (600, 1, (1, 1000), False),
+}
+
+
+def _channel_frames(rng, key_count, frame_range, subframe):
+    first, last = frame_range
+    if key_count >= (last - first) // 2:
+        start = rng.randint(first, max(first, last - key_count))
+        frames = list(range(start, start + key_count))
+    else:
+        frames = sorted(rng.sample(range(first, last), key_count))
+    if subframe:
+        frames = [frame + rng.choice((0, 0.25, 0.5, 0.75)) for frame in frames]
+    return frames
+
+def build_node(rng, name, profile, panel_only_keys=False):
+    """
+    Args:
+        rng (random.Random): source of the node's key frames
+        name (str): node name
+        profile (str): key density profile, one of PROFILES
+        panel_only_keys (bool, optional): also give the node a knob whose keys can only be read
+                                          with its Properties panel open
+
+    Return:
+        fake_nuke.Node: a Transform-like node
+    """
+    key_count, animated_count, frame_range, subframe = PROFILES[profile]
+    node = fake_nuke.Node("Transform", name)
+    animated = set(rng.sample(range(len(ARRAY_KNOBS)), animated_count))
+    for ind, (knob_name, knob_class, channel_count) in enumerate(ARRAY_KNOBS):
+        channels = []
+        if ind in animated:
+            channels = [_channel_frames(rng, key_count, frame_range, subframe) for _ in range(channel_count)]
+        node.addKnob(fake_nuke.Array_Knob(knob_name, knob_class, channels))
+    for knob_name, knob_class in STATIC_KNOBS:
+        node.addKnob(fake_nuke.Knob(knob_name, knob_class))
+    if panel_only_keys:
+        channels = [_channel_frames(rng, key_count, frame_range, subframe)]
+        node.addKnob(fake_nuke.Knob("curves", "Roto_Curves_Knob", channels))
+    return node
+
+def build_scene(node_count, profile="sparse", group_depth=0, nodes_per_group=50, panel_only_ratio=0.0, seed=0):
+    """
+    Build a synthetic script and make it the fake nuke module's current script.
+
+    Args:
+        node_count (int): number of animated nodes, groups not included
+        profile (str, optional): key density profile, one of PROFILES
+        group_depth (int, optional): how deeply nested the groups holding the nodes are, 0 for no groups
+        nodes_per_group (int, optional): nodes put into each innermost group
+        panel_only_ratio (float, optional): share of nodes with keys only readable with their panel open
+        seed (int, optional): seed of the random key frames
+
+    Return:
+        fake_nuke.Root: root of the script
+    """
+    rng = random.Random(seed)
+    root = fake_nuke.Root()
+    parent = root
+    group_count = 0
+    for ind in range(node_count):
+        if group_depth and ind % nodes_per_group == 0:
+            # Start a new chain of nested groups, from the root down.
+            parent = root
+            for _ in range(group_depth):
+                group_count += 1
+                parent = parent.add(fake_nuke.Group(name="Group{0}".format(group_count)))
+        node = build_node(rng, "Transform{0}".format(ind + 1), profile, rng.random() < panel_only_ratio)
+        parent.add(node)
+
+    fake_nuke.set_scene(root)
+    return root
+
+def animated_nodes(root):
+    """
+    Return:
+        list: every non-group node of the script
+    """
+    return [node for node in root.nodes(recurse=True) if not isinstance(node, fake_nuke.Group)]